@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -49,6 +50,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'productos.middleware.PrimarioTrasEscrituraMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -80,7 +82,47 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
+    # Réplica de solo lectura. En desarrollo es una copia del archivo de
+    # 'default' que mantiene al día "manage.py sincronizar_replica" (ver
+    # INVENTARIO_REPLICAS)
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db_replica.sqlite3',
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
+}
+
+DATABASE_ROUTERS = ['productos.routers.ReplicaRouter']
+
+# Alias de DATABASES que reciben las lecturas de listados y reportes, separados
+# por comas en la variable de entorno (por ejemplo INVENTARIO_REPLICAS=replica).
+# Por defecto no hay réplicas y todo se lee del primario. Con la réplica SQLite
+# de desarrollo hay que dejar corriendo junto al servidor
+#     python manage.py sincronizar_replica --intervalo 5
+# o los listados mostrarán datos cada vez más viejos. Mientras la réplica no
+# exista o no tenga las tablas, las lecturas van al primario.
+INVENTARIO_REPLICAS = [alias for alias in os.environ.get('INVENTARIO_REPLICAS', '').replace(' ', '').split(',') if alias]
+
+# Segundos durante los que una sesión lee del primario después de escribir
+INVENTARIO_PRIMARIO_TRAS_ESCRITURA = 5
+
+# Resúmenes de productos que quedan por debajo del stock mínimo. Los envía
+# "python manage.py notificar_stock_bajo", que tiene que correr junto al
+# servidor. Sin sinks no se registran avisos. Cada sink es una clase de
+# productos.notificaciones (o propia) con sus opciones, por ejemplo:
+#     {'CLASE': 'productos.notificaciones.ArchivoSink',
+#      'OPCIONES': {'ruta': '/var/log/inventario/stock_bajo.jsonl'}},
+#     {'CLASE': 'productos.notificaciones.EmailSink',
+#      'OPCIONES': {'destinatarios': ['compras@empresa.com']}},  # usa EMAIL_BACKEND
+#     {'CLASE': 'productos.notificaciones.WebhookSink',
+#      'OPCIONES': {'url': 'https://example.com/hooks/stock-bajo'}},
+INVENTARIO_NOTIFICACIONES = {
+    'INTERVALO': 60,  # segundos entre resúmenes
+    'MAX_POR_RESUMEN': 10000,  # avisos por resumen; el resto va en el siguiente
+    'SINKS': [],
 }
 
 
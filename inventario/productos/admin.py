@@ -1,8 +1,33 @@
 from django.contrib import admin
+from django.db import transaction
+from django.utils import timezone
+from .models import Producto, MovimientoStock
 
 # Register your models here.
 @admin.register(Producto)
 class ProductoAdmin(admin.ModelAdmin):
-    list_display = ['nombre', 'precio', 'stock', 'necesita_reposicion']
+    list_display = ['codigo', 'nombre', 'precio', 'stock', 'necesita_reposicion']
     list_filter = ['stock']
-    search_fields = ['nombre']
\ No newline at end of file
+    search_fields = ['codigo', 'nombre']
+    # La versión la maneja el bloqueo optimista, no se edita a mano
+    readonly_fields = ['version']
+
+    def save_model(self, request, obj, form, change):
+        """
+        Un cambio de stock desde el admin queda registrado como movimiento,
+        igual que en AjusteStockView, para que el libro de movimientos y las
+        series de stock coincidan con Producto.stock.
+        """
+        anterior = form.initial.get("stock", 0) if change else 0
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            diferencia = obj.stock - anterior
+            if diferencia:
+                MovimientoStock.objects.create(
+                    producto=obj,
+                    tipo="entrada" if diferencia > 0 else "salida",
+                    cantidad=abs(diferencia),
+                    motivo="Ajuste desde el admin" if change else "Stock inicial",
+                    fecha=timezone.now(),
+                    usuario=request.user.get_username(),
+                )
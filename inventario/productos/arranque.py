@@ -0,0 +1,85 @@
+# -----------------------------------------------------------------------------
+# productos/arranque.py
+# Medición del arranque en frío del proyecto. Se lanza un intérprete nuevo con
+# "python -X importtime" que ejecuta django.setup() (y opcionalmente carga el
+# URLconf o prepara un comando de manage.py) y se parsea el costo de
+# importación de cada módulo.
+# -----------------------------------------------------------------------------
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+
+_SCRIPT = """
+import sys, time
+inicio = time.perf_counter()
+import django
+django.setup()
+if {importar_urls}:
+    from django.urls import get_resolver
+    get_resolver().url_patterns
+if {comando!r}:
+    # Lo mismo que hace BaseCommand.execute() antes de llamar a handle()
+    from django.core.management import get_commands, load_command_class
+    comando = load_command_class(get_commands()[{comando!r}], {comando!r})
+    if comando.requires_system_checks:
+        comando.check()
+print(time.perf_counter() - inicio)
+"""
+
+
+class ModuloImportado:
+    """Costo de importación de un módulo, en microsegundos."""
+
+    def __init__(self, nombre, propio, acumulado):
+        self.nombre = nombre
+        self.propio = propio
+        self.acumulado = acumulado
+
+
+class PerfilArranque:
+    """Resultado de una medición: tiempo total (segundos) y módulos importados."""
+
+    def __init__(self, segundos, modulos):
+        self.segundos = segundos
+        self.modulos = modulos
+
+    @property
+    def nombres(self):
+        return {modulo.nombre for modulo in self.modulos}
+
+    def mas_costosos(self, cantidad=20, orden="acumulado"):
+        return sorted(self.modulos, key=lambda m: getattr(m, orden), reverse=True)[:cantidad]
+
+
+def parsear_importtime(salida):
+    """Convierte la salida de '-X importtime' en una lista de ModuloImportado."""
+    modulos = []
+    for linea in salida.splitlines():
+        if not linea.startswith("import time:"):
+            continue
+        propio, acumulado, nombre = linea[len("import time:"):].split("|")
+        if not propio.strip().isdigit():
+            continue  # encabezado
+        modulos.append(ModuloImportado(nombre.strip(), int(propio), int(acumulado)))
+    return modulos
+
+
+def medir_arranque(importar_urls=False, comando=None):
+    """
+    Mide django.setup() en un proceso nuevo. Con importar_urls=True también
+    carga el URLconf, como hace un worker antes de atender la primera request.
+    Con comando="nombre" también carga ese comando de manage.py y corre los
+    system checks si el comando los pide.
+    """
+    entorno = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _SCRIPT.format(importar_urls=importar_urls, comando=comando)],
+        cwd=settings.BASE_DIR,
+        env=entorno,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return PerfilArranque(float(proceso.stdout.strip().splitlines()[-1]), parsear_importtime(proceso.stderr))
@@ -1,5 +1,6 @@
+# Helpers de Crispy Forms. Este módulo se importa solo desde los __init__ de
+# los formularios, para no cargar Crispy Forms al arrancar cada proceso.
 from crispy_forms.helper import FormHelper
-from crispy_forms.layout import Layout, Submit, Row, Column
 
 class BaseFormHelper(FormHelper):
     def __init__(self, *args, **kwargs):
@@ -8,4 +9,13 @@ class BaseFormHelper(FormHelper):
         self.form_class = "form-horizontal"
         self.label_class = "col-md-3 col-form-label"
         self.field_class = "col-md-9"
-        self.render_required_fields = "True"
\ No newline at end of file
+        self.render_required_fields = "True"
+
+# Helper específico para formularios de filtro en línea
+class FiltroFormHelper(FormHelper):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.form_method = 'get'  # Los formularios de filtro usan el método GET
+        self.form_class = 'form-inline'  # Clase de Bootstrap para formularios en línea
+        # Plantilla específica para campos en línea, muy útil para este tipo de formularios
+        self.field_template = 'bootstrap4/layout/inline_field.html'
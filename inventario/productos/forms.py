@@ -1,14 +1,32 @@
 # Importaciones necesarias de Django y Crispy Forms
 from django import forms
 from django.core.exceptions import ValidationError
+from django.utils.safestring import mark_safe
 # Importamos los modelos para los formularios basados en modelos
 from .models import Producto, MovimientoStock
-# Importamos las herramientas de Crispy Forms
-from crispy_forms.helper import FormHelper
-from crispy_forms.layout import Layout, Row, Column, Submit, Reset, ButtonHolder, Field, Div, HTML
-from crispy_forms.bootstrap import AppendedText, PrependedText, FormActions
-# Importamos nuestro helper base para no repetir código
-from .crispy import BaseFormHelper
+# Las herramientas de Crispy Forms y nuestros helpers (.crispy) se importan
+# dentro de cada __init__: así solo se cargan cuando se construye un formulario
+
+# -----------------------------------------------------------------------------
+# Reglas de validación compartidas
+# Se usan desde ProductoForm y desde la importación masiva del catálogo,
+# que valida filas sin construir un formulario por cada una.
+# -----------------------------------------------------------------------------
+def validar_precio(precio):
+    # Si el precio existe y es menor o igual a cero, lanza un error de validación
+    if precio and precio <= 0:
+        raise ValidationError("El precio debe ser mayor a cero")
+    return precio
+
+def validar_stock(stock):
+    if stock and stock < 0:
+        raise ValidationError("No puede haber valor negativo de stock")
+    return stock
+
+def validar_stock_minimo(stock_minimo):
+    if stock_minimo and stock_minimo < 0:
+        raise ValidationError("No puede haber valor negativo de stock minimo")
+    return stock_minimo
 
 # -----------------------------------------------------------------------------
 # Formulario para el modelo Producto
@@ -22,10 +40,11 @@ class ProductoForm(forms.ModelForm):
         # Vinculamos este formulario al modelo Producto
         model = Producto
         # Especificamos los campos que se incluirán en el formulario
-        fields = ["nombre", "descripcion", "precio", "stock", "stock_minimo", "imagen"]
+        fields = ["codigo", "nombre", "descripcion", "precio", "stock", "stock_minimo", "imagen", "version"]
         # Usamos widgets para personalizar la apariencia de los campos HTML
         widgets = {
             "descripcion": forms.Textarea(attrs={"rows": 3}),  # Cambia el campo de texto a un área de texto más grande
+            "version": forms.HiddenInput(),  # Versión leída al abrir el formulario (bloqueo optimista)
         }
         # Personalizamos las etiquetas de los campos
         labels = {
@@ -38,19 +57,35 @@ class ProductoForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        from crispy_forms.layout import Layout, Field, ButtonHolder, Submit, Reset, HTML
+        from crispy_forms.bootstrap import PrependedText
+        from .crispy import BaseFormHelper
+        if self.instance.pk is None:
+            # Al crear se usa la versión por defecto del modelo
+            del self.fields["version"]
+        else:
+            # Al editar el stock solo cambia con movimientos y ajustes, y cada
+            # campo lleva oculto el valor con el que se abrió el formulario:
+            # así changed_data son los campos que el usuario editó
+            del self.fields["stock"]
+            for campo in self.fields.values():
+                if not isinstance(campo.widget, (forms.HiddenInput, forms.FileInput)):
+                    campo.show_hidden_initial = True
         # Asignamos nuestro helper de formulario base para el diseño
         self.helper = BaseFormHelper()
 
         # Definimos el layout del formulario con la estructura de Crispy Forms
         self.helper.layout = Layout(
             # Un 'Field' representa un campo de formulario estándar
+            Field("codigo"),
             Field("nombre"),
             Field("descripcion"),
             # 'PrependedText' añade un prefijo (ej: el símbolo de $) al campo de precio
             PrependedText("precio", "$", placeholder="0.00"),
-            Field("stock"),
+            *[Field(campo) for campo in ["stock"] if campo in self.fields],
             Field("stock_minimo"),
             Field("imagen"),
+            *[Field(campo) for campo in ["version"] if campo in self.fields],
             # 'ButtonHolder' agrupa los botones en un contenedor
             ButtonHolder(
                 # 'Submit' crea un botón para enviar el formulario
@@ -62,29 +97,30 @@ class ProductoForm(forms.ModelForm):
             )
         )
 
+    def iniciales_ocultos(self):
+        """
+        Inputs ocultos con el valor inicial de cada campo (show_hidden_initial).
+        El filtro |crispy no los dibuja: la plantilla los agrega aparte.
+        """
+        return mark_safe("".join(
+            self[nombre].as_hidden(only_initial=True)
+            for nombre, campo in self.fields.items()
+            if campo.show_hidden_initial
+        ))
+
     # --------------------------------------------------------------------------
     # Validaciones personalizadas a nivel de campo
     # --------------------------------------------------------------------------
     def clean_precio(self):
         # Obtiene el dato del formulario después de la limpieza inicial de Django
-        precio = self.cleaned_data.get("precio")
-        # Si el precio existe y es menor o igual a cero, lanza un error de validación
-        if precio and precio <= 0:
-            raise ValidationError("El precio debe ser mayor a cero")
-        # Si la validación es exitosa, devuelve el valor del campo
-        return precio
+        # y le aplica la regla compartida; si es válido se devuelve el valor
+        return validar_precio(self.cleaned_data.get("precio"))
     
     def clean_stock(self):
-        stock = self.cleaned_data.get("stock")
-        if stock and stock < 0:
-            raise ValidationError("No puede haber valor negativo de stock")
-        return stock
+        return validar_stock(self.cleaned_data.get("stock"))
     
     def clean_stock_minimo(self):
-        stock_minimo = self.cleaned_data.get("stock_minimo")
-        if stock_minimo and stock_minimo < 0:
-            raise ValidationError("No puede haber valor negativo de stock minimo")
-        return stock_minimo
+        return validar_stock_minimo(self.cleaned_data.get("stock_minimo"))
     
 # -----------------------------------------------------------------------------
 # Formulario para el modelo MovimientoStock
@@ -110,6 +146,8 @@ class MovimientoStockForm(forms.ModelForm):
         # Sacamos la instancia del producto de los kwargs para usarla en la validación y el layout
         self.producto = kwargs.pop("producto", None)
         super().__init__(*args, **kwargs)
+        from crispy_forms.layout import Layout, Field, ButtonHolder, Submit, HTML
+        from .crispy import BaseFormHelper
         self.helper = BaseFormHelper()
 
         # Creamos una cadena HTML para mostrar información del producto
@@ -172,6 +210,8 @@ class AjusteStockForm(forms.Form):
     def __init__(self, *args, **kwargs):
         self.producto = kwargs.pop('producto', None)
         super().__init__(*args, **kwargs)
+        from crispy_forms.layout import Layout, Field, ButtonHolder, Submit, HTML
+        from .crispy import BaseFormHelper
         self.helper = BaseFormHelper()
         
         # Mostramos el stock actual para contexto del usuario
@@ -197,17 +237,41 @@ class AjusteStockForm(forms.Form):
         )
 
 # -----------------------------------------------------------------------------
-# Helpers y formularios para filtros
+# Formulario para importar el catálogo de productos
 # -----------------------------------------------------------------------------
+class ImportarProductosForm(forms.Form):
+    """
+    Formulario para subir un catálogo de productos en CSV o JSONL.
+    El archivo se procesa en streaming, por lotes.
+    """
+    archivo = forms.FileField(
+        label="Archivo",
+        help_text="CSV con encabezado o JSONL (un producto por línea). La columna 'codigo' es obligatoria."
+    )
 
-# Helper específico para formularios de filtro en línea
-class FiltroFormHelper(FormHelper):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.form_method = 'get'  # Los formularios de filtro usan el método GET
-        self.form_class = 'form-inline'  # Clase de Bootstrap para formularios en línea
-        # Plantilla específica para campos en línea, muy útil para este tipo de formularios
-        self.field_template = 'bootstrap4/layout/inline_field.html'
+        from crispy_forms.layout import Layout, Field, ButtonHolder, Submit, HTML
+        from .crispy import BaseFormHelper
+        self.helper = BaseFormHelper()
+        self.helper.form_enctype = "multipart/form-data"
+        self.helper.layout = Layout(
+            Field("archivo"),
+            ButtonHolder(
+                Submit("submit", "Importar", css_class="btn btn-success"),
+                HTML('<a href="{% url "productos:producto_list" %}" class="btn btn-secondary">Cancelar</a>')
+            )
+        )
+
+    def clean_archivo(self):
+        archivo = self.cleaned_data.get("archivo")
+        if archivo and not archivo.name.lower().endswith((".csv", ".jsonl")):
+            raise ValidationError("Formato no soportado. Use .csv o .jsonl")
+        return archivo
+
+# -----------------------------------------------------------------------------
+# Helpers y formularios para filtros
+# -----------------------------------------------------------------------------
 
 # Formulario para filtrar la lista de productos
 class FiltroProductosForm(forms.Form):
@@ -234,6 +298,8 @@ class FiltroProductosForm(forms.Form):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        from crispy_forms.layout import Layout, Row, Column, ButtonHolder, Submit, HTML
+        from .crispy import FiltroFormHelper
         # Usamos el helper de filtro específico
         self.helper = FiltroFormHelper()
         
@@ -252,4 +318,57 @@ class FiltroProductosForm(forms.Form):
                 # Alineamos los elementos verticalmente al centro
                 css_class='form-row align-items-center'
             )
-        )
\ No newline at end of file
+        )
+
+# Formulario para filtrar el historial de movimientos
+class FiltroMovimientosForm(forms.Form):
+    """
+    Formulario para filtrar el historial de movimientos por tipo, usuario
+    y rango de fechas. No se basa en un modelo.
+    """
+    tipo = forms.ChoiceField(
+        choices=[('', 'Todos')] + MovimientoStock.TIPO_CHOICES,
+        required=False,
+        label="Tipo"
+    )
+    usuario = forms.CharField(required=False, max_length=50, label="Usuario")
+    desde = forms.DateField(
+        required=False,
+        label="Desde",
+        widget=forms.DateInput(attrs={'type': 'date'})
+    )
+    hasta = forms.DateField(
+        required=False,
+        label="Hasta",
+        widget=forms.DateInput(attrs={'type': 'date'})
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        from crispy_forms.layout import Layout, Row, Column, ButtonHolder, Submit, HTML
+        from .crispy import FiltroFormHelper
+        self.helper = FiltroFormHelper()
+        self.helper.layout = Layout(
+            Row(
+                Column('tipo', css_class='form-group col-md-2 mb-0'),
+                Column('usuario', css_class='form-group col-md-3 mb-0'),
+                Column('desde', css_class='form-group col-md-2 mb-0'),
+                Column('hasta', css_class='form-group col-md-2 mb-0'),
+                Column(
+                    ButtonHolder(
+                        Submit('submit', 'Filtrar', css_class='btn btn-primary'),
+                        HTML('<a href="." class="btn btn-secondary">Limpiar</a>')
+                    ),
+                    css_class='form-group col-md-3 mb-0'
+                ),
+                css_class='form-row align-items-center'
+            )
+        )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        desde = cleaned_data.get("desde")
+        hasta = cleaned_data.get("hasta")
+        if desde and hasta and desde > hasta:
+            raise ValidationError("La fecha 'desde' no puede ser posterior a 'hasta'")
+        return cleaned_data
@@ -0,0 +1,291 @@
+# -----------------------------------------------------------------------------
+# productos/importacion.py
+# Importación masiva del catálogo de productos desde CSV o JSONL.
+# El archivo se lee en streaming y se procesa por lotes: cada lote se valida
+# con las mismas reglas que ProductoForm, se hace un upsert en una sola
+# sentencia preparada y se registran en bloque los movimientos de stock inicial.
+# -----------------------------------------------------------------------------
+import csv
+import functools
+import io
+import json
+import os
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.core.validators import DecimalValidator
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import insercion, series
+from .forms import validar_precio, validar_stock, validar_stock_minimo
+from .models import Producto, MovimientoStock
+
+# Cantidad de filas que se mantienen en memoria y se escriben por transacción
+TAMANIO_LOTE = 2000
+# Cantidad máxima de errores que se guardan con detalle (el resto solo se cuenta)
+MAX_ERRORES = 100
+FORMATOS = ("csv", "jsonl")
+
+# Campos que se actualizan cuando el código ya existe. El stock no se pisa:
+# solo se modifica a través de movimientos.
+CAMPOS_ACTUALIZABLES = ["nombre", "descripcion", "precio", "stock_minimo", "fecha_actualizacion"]
+# Columnas del INSERT, en el orden de las tuplas que arma _guardar_lote
+CAMPOS_INSERTADOS = [
+    "codigo", "nombre", "descripcion", "precio", "stock", "stock_minimo",
+    "fecha_creacion", "fecha_actualizacion", "version",
+]
+
+_validar_decimal_precio = DecimalValidator(max_digits=10, decimal_places=2)
+
+
+class ArchivoInvalido(Exception):
+    """
+    El archivo no se puede leer (codificación o CSV mal formado). Los lotes
+    anteriores al error ya quedaron guardados: se informan en 'resultado'.
+    """
+
+    def __init__(self, mensaje, resultado):
+        super().__init__(mensaje)
+        self.resultado = resultado
+
+
+class ResultadoImportacion:
+    """Resumen de una importación: contadores y errores por línea."""
+
+    def __init__(self):
+        self.creados = 0
+        self.actualizados = 0
+        self.movimientos = 0
+        self.total_errores = 0
+        self.errores = []
+
+    @property
+    def procesados(self):
+        return self.creados + self.actualizados
+
+    def agregar_error(self, linea, mensaje):
+        self.total_errores += 1
+        if len(self.errores) < MAX_ERRORES:
+            self.errores.append((linea, mensaje))
+
+
+def detectar_formato(nombre_archivo):
+    """Devuelve el formato a partir de la extensión del archivo."""
+    extension = os.path.splitext(nombre_archivo)[1].lower().lstrip(".")
+    if extension not in FORMATOS:
+        raise ValueError(f"Formato no soportado: {nombre_archivo}")
+    return extension
+
+
+def leer_filas(archivo, formato):
+    """
+    Genera tuplas (numero_de_linea, fila) a partir de un archivo binario,
+    sin cargarlo completo en memoria.
+    """
+    texto = io.TextIOWrapper(archivo, encoding="utf-8-sig", newline="")
+    try:
+        if formato == "csv":
+            lector = csv.DictReader(texto)
+            for fila in lector:
+                yield lector.line_num, fila
+        else:
+            for numero, linea in enumerate(texto, start=1):
+                if not linea.strip():
+                    continue
+                try:
+                    fila = json.loads(linea, parse_float=Decimal)
+                except ValueError:
+                    yield numero, None
+                    continue
+                yield numero, fila
+    finally:
+        # Evita que el wrapper cierre el archivo original al ser descartado
+        texto.detach()
+
+
+def _texto(fila, campo, max_length, requerido=True):
+    valor = fila.get(campo)
+    valor = "" if valor is None else str(valor).strip()
+    if requerido and not valor:
+        raise ValidationError(f"{campo}: este campo es obligatorio")
+    if len(valor) > max_length:
+        raise ValidationError(f"{campo}: máximo {max_length} caracteres")
+    return valor
+
+
+@functools.cache
+def _rango_entero():
+    # connection.ops pasa por un asgiref.Local: se consulta una vez y no por fila
+    return connection.ops.integer_field_range("IntegerField")
+
+
+def _entero(fila, campo, por_defecto):
+    valor = fila.get(campo)
+    if valor is None or valor == "":
+        return por_defecto
+    # JSONL trae int, Decimal (parse_float) o bool; CSV trae texto. int() a
+    # secas truncaría 1.9 y aceptaría true como 1 sin avisar
+    if isinstance(valor, bool):
+        raise ValidationError(f"{campo}: debe ser un número entero")
+    if isinstance(valor, str):
+        try:
+            valor = int(valor)
+        except ValueError:
+            # "3.0" o "1e2": enteros escritos como decimales
+            pass
+    if not isinstance(valor, int):
+        try:
+            valor = Decimal(str(valor).strip())
+        except InvalidOperation:
+            raise ValidationError(f"{campo}: debe ser un número entero")
+        if not valor.is_finite() or valor != valor.to_integral_value():
+            raise ValidationError(f"{campo}: debe ser un número entero")
+    # Fuera del rango de la columna fallaría recién en el INSERT, con los
+    # lotes anteriores ya guardados
+    minimo, maximo = _rango_entero()
+    if not minimo <= valor <= maximo:
+        raise ValidationError(f"{campo}: debe estar entre {minimo} y {maximo}")
+    return int(valor)
+
+
+def validar_fila(fila):
+    """
+    Convierte y valida una fila del catálogo. Aplica las mismas reglas que
+    ProductoForm sin instanciar un formulario. Lanza ValidationError.
+    """
+    if not isinstance(fila, dict):
+        raise ValidationError("Fila con formato inválido")
+
+    codigo = _texto(fila, "codigo", 50)
+    nombre = _texto(fila, "nombre", 50)
+    descripcion = _texto(fila, "descripcion", 200)
+
+    try:
+        precio = Decimal(str(fila.get("precio", "")).strip())
+    except InvalidOperation:
+        raise ValidationError("precio: debe ser un número")
+    if not precio.is_finite():
+        raise ValidationError("precio: debe ser un número")
+    _validar_decimal_precio(precio)
+
+    stock = _entero(fila, "stock", 0)
+    stock_minimo = _entero(fila, "stock_minimo", 5)
+
+    return {
+        "codigo": codigo,
+        "nombre": nombre,
+        "descripcion": descripcion,
+        "precio": validar_precio(precio),
+        "stock": validar_stock(stock),
+        "stock_minimo": validar_stock_minimo(stock_minimo),
+    }
+
+
+def _guardar_lote(lote, usuario, resultado):
+    """
+    Hace el upsert de un lote y crea los movimientos de stock inicial.
+    Las filas se arman como tuplas y se escriben con executemany (ver
+    insercion.py): tres sentencias preparadas por lote en lugar de compilar
+    un objeto por fila.
+    """
+    codigos = list(lote)
+    ahora = timezone.now()
+    fecha = insercion.adaptar_fecha(ahora)
+    adaptar_precio = insercion.adaptador_decimal(Producto._meta.get_field("precio"))
+    with transaction.atomic():
+        # El upsert no pisa el stock y, en la misma sentencia, incrementa la
+        # versión de los existentes para que las ediciones abiertas detecten
+        # el cambio
+        insercion.insertar(
+            Producto,
+            CAMPOS_INSERTADOS,
+            [
+                (
+                    datos["codigo"], datos["nombre"], datos["descripcion"],
+                    adaptar_precio(datos["precio"]),
+                    datos["stock"], datos["stock_minimo"], fecha, fecha, 0,
+                )
+                for datos in lote.values()
+            ],
+            unique_fields=["codigo"],
+            update_fields=CAMPOS_ACTUALIZABLES,
+            incrementar="version",
+        )
+
+        # Después del upsert los existentes tienen versión 1 o más y los recién
+        # creados 0: una sola consulta da los ids y cuáles son nuevos
+        ids = {}
+        existentes = 0
+        for codigo, pk, version in Producto.objects.filter(codigo__in=codigos).values_list(
+            "codigo", "pk", "version"
+        ):
+            if version:
+                existentes += 1
+            else:
+                ids[codigo] = pk
+
+        # Igual que ProductoCreateView.form_valid: solo los productos nuevos
+        # con stock mayor a cero generan un movimiento de "Stock inicial"
+        nuevos = [c for c in ids if lote[c]["stock"] > 0]
+        if nuevos:
+            insercion.insertar(
+                MovimientoStock,
+                ["producto", "tipo", "cantidad", "motivo", "fecha", "usuario"],
+                [
+                    (ids[codigo], "entrada", lote[codigo]["stock"], "Stock inicial", fecha, usuario)
+                    for codigo in nuevos
+                ],
+            )
+            # Sin post_save: las series se crean acá. Son productos nuevos, así
+            # que no hace falta buscar intervalos previos
+            series.crear_series_iniciales(
+                (ids[codigo], ahora, lote[codigo]["stock"]) for codigo in nuevos
+            )
+
+    resultado.creados += len(codigos) - existentes
+    resultado.actualizados += existentes
+    resultado.movimientos += len(nuevos)
+
+
+def importar_productos(archivo, formato, usuario="Sistema", tamanio_lote=TAMANIO_LOTE):
+    """
+    Importa un catálogo desde un archivo binario (CSV o JSONL).
+    Los productos se identifican por 'codigo': si existe se actualiza, si no
+    se crea. Cada lote se confirma en su propia transacción, así que las
+    filas inválidas no frenan al resto.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato no soportado: {formato}")
+
+    resultado = ResultadoImportacion()
+    # Dict por código: si un código se repite dentro del lote, gana la última fila
+    lote = {}
+    linea = 0
+    try:
+        for linea, fila in leer_filas(archivo, formato):
+            try:
+                datos = validar_fila(fila)
+            except ValidationError as e:
+                resultado.agregar_error(linea, "; ".join(e.messages))
+                continue
+            lote[datos["codigo"]] = datos
+            if len(lote) >= tamanio_lote:
+                _guardar_lote(lote, usuario, resultado)
+                lote = {}
+    except UnicodeDecodeError:
+        raise ArchivoInvalido(
+            f"El archivo no está codificado en UTF-8 (después de la línea {linea}). "
+            f"Se guardaron {resultado.procesados} productos antes del error.",
+            resultado,
+        )
+    except csv.Error as e:
+        raise ArchivoInvalido(
+            f"CSV mal formado después de la línea {linea}: {e}. "
+            f"Se guardaron {resultado.procesados} productos antes del error.",
+            resultado,
+        )
+
+    if lote:
+        _guardar_lote(lote, usuario, resultado)
+    return resultado
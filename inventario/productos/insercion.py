@@ -0,0 +1,54 @@
+# -----------------------------------------------------------------------------
+# productos/insercion.py
+# INSERT en bloque con executemany para la importación del catálogo.
+# bulk_create compila cada objeto (Model.__init__, get_db_prep_save por
+# campo): con catálogos grandes ese costo supera al de la base. Acá las filas
+# llegan como tuplas ya adaptadas y la sentencia se prepara una sola vez.
+# Los valores tienen que venir convertidos con adaptar_fecha/adaptador_decimal.
+# -----------------------------------------------------------------------------
+from django.db import connection
+from django.db.models.constants import OnConflict
+
+
+def adaptar_fecha(valor):
+    """Adapta un datetime al formato de la base (una vez por lote, no por fila)."""
+    return connection.ops.adapt_datetimefield_value(valor)
+
+
+def adaptador_decimal(campo):
+    """
+    Devuelve una función que adapta un Decimal según max_digits/decimal_places
+    del campo. connection.ops se resuelve una vez por lote y no por fila.
+    """
+    adaptar = connection.ops.adapt_decimalfield_value
+    return lambda valor: adaptar(valor, campo.max_digits, campo.decimal_places)
+
+
+def insertar(modelo, campos, filas, unique_fields=None, update_fields=None, incrementar=None):
+    """
+    Inserta 'filas' (tuplas en el orden de 'campos') en la tabla de 'modelo'.
+    Con unique_fields/update_fields hace un upsert igual al de bulk_create
+    (update_conflicts=True); 'incrementar' suma 1 a ese campo en las filas
+    que ya existían, en la misma sentencia.
+    """
+    quote = connection.ops.quote_name
+    opts = modelo._meta
+    columnas = [opts.get_field(nombre).column for nombre in campos]
+    sql = "INSERT INTO %s (%s) VALUES (%s)" % (
+        quote(opts.db_table),
+        ", ".join(map(quote, columnas)),
+        ", ".join(["%s"] * len(columnas)),
+    )
+    if unique_fields:
+        sql += " " + connection.ops.on_conflict_suffix_sql(
+            [opts.get_field(nombre) for nombre in campos],
+            OnConflict.UPDATE,
+            [opts.get_field(nombre).column for nombre in update_fields],
+            [opts.get_field(nombre).column for nombre in unique_fields],
+        )
+        if incrementar:
+            # Sin calificar, la columna se refiere a la fila existente
+            columna = quote(opts.get_field(incrementar).column)
+            sql += f", {columna} = {columna} + 1"
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, filas)
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from productos.importacion import TAMANIO_LOTE, ArchivoInvalido, detectar_formato, importar_productos
+
+
+class Command(BaseCommand):
+    help = "Importa (crea o actualiza) productos desde un catálogo CSV o JSONL"
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("archivo", help="Ruta al archivo .csv o .jsonl")
+        parser.add_argument(
+            "--formato",
+            choices=["csv", "jsonl"],
+            help="Formato del archivo. Por defecto se deduce de la extensión",
+        )
+        parser.add_argument(
+            "--lote",
+            type=int,
+            default=TAMANIO_LOTE,
+            help=f"Filas por transacción (por defecto {TAMANIO_LOTE})",
+        )
+        parser.add_argument(
+            "--usuario",
+            default="Sistema",
+            help="Usuario registrado en los movimientos de stock inicial",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            formato = options["formato"] or detectar_formato(options["archivo"])
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options["lote"] <= 0:
+            raise CommandError("--lote debe ser mayor a cero")
+
+        try:
+            with open(options["archivo"], "rb") as archivo:
+                resultado = importar_productos(
+                    archivo, formato, usuario=options["usuario"], tamanio_lote=options["lote"]
+                )
+        except OSError as e:
+            raise CommandError(f"No se pudo leer el archivo: {e}")
+        except ArchivoInvalido as e:
+            raise CommandError(str(e))
+
+        for linea, mensaje in resultado.errores:
+            self.stderr.write(f"Línea {linea}: {mensaje}")
+        if resultado.total_errores > len(resultado.errores):
+            self.stderr.write(f"... y {resultado.total_errores - len(resultado.errores)} errores más")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Creados: {resultado.creados} - Actualizados: {resultado.actualizados} - "
+            f"Movimientos: {resultado.movimientos} - Errores: {resultado.total_errores}"
+        ))
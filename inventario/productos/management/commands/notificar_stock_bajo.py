@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from productos.notificaciones import configuracion, construir_sinks, enviar_resumen
+
+
+class Command(BaseCommand):
+    help = (
+        "Envía a los sinks de INVENTARIO_NOTIFICACIONES los resúmenes de productos "
+        "que quedaron por debajo del stock mínimo. Tiene que correr un solo "
+        "proceso junto al servidor."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--intervalo",
+            type=float,
+            help="Segundos entre resúmenes (por defecto INTERVALO de INVENTARIO_NOTIFICACIONES)",
+        )
+        parser.add_argument(
+            "--una-vez",
+            action="store_true",
+            help="Envía lo pendiente y termina",
+        )
+
+    def handle(self, *args, **options):
+        sinks = construir_sinks()
+        if not sinks:
+            raise CommandError("No hay sinks configurados en INVENTARIO_NOTIFICACIONES")
+        intervalo = options["intervalo"] or configuracion()["INTERVALO"]
+
+        try:
+            while True:
+                # Si quedan cruces después de un resumen se envía el siguiente sin
+                # esperar. Si un sink falló, los cruces se reintentan en el
+                # próximo intervalo y no en seguida
+                resumen = enviar_resumen(sinks)
+                while resumen is not None:
+                    if resumen.fallidos:
+                        self.stderr.write(
+                            f"Falló el envío a {', '.join(resumen.fallidos)}: "
+                            f"{len(resumen.items)} productos quedan para el próximo resumen"
+                        )
+                        break
+                    self.stdout.write(f"Resumen enviado: {len(resumen.items)} productos")
+                    resumen = enviar_resumen(sinks) if resumen.pendientes else None
+                if options["una_vez"]:
+                    break
+                time.sleep(intervalo)
+        except KeyboardInterrupt:
+            pass
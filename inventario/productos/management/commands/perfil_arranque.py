@@ -0,0 +1,47 @@
+import subprocess
+
+from django.core.management.base import BaseCommand, CommandError
+
+from productos.arranque import medir_arranque
+
+
+class Command(BaseCommand):
+    help = "Muestra el costo de importación por módulo de django.setup() en un proceso nuevo"
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--urls",
+            action="store_true",
+            help="Incluye la carga del URLconf (arranque de un worker web)",
+        )
+        parser.add_argument(
+            "--comando",
+            help="Incluye la carga de un comando de manage.py y sus system checks",
+        )
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=25,
+            help="Cantidad de módulos a listar (por defecto 25)",
+        )
+        parser.add_argument(
+            "--orden",
+            choices=["acumulado", "propio"],
+            default="acumulado",
+            help="Ordena por tiempo acumulado (con dependencias) o propio",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            perfil = medir_arranque(importar_urls=options["urls"], comando=options["comando"])
+        except subprocess.CalledProcessError as e:
+            raise CommandError(f"El arranque falló:\n{e.stderr}")
+
+        self.stdout.write(f"{'Propio (ms)':>12} {'Acumulado (ms)':>15}  Módulo")
+        for modulo in perfil.mas_costosos(options["top"], options["orden"]):
+            self.stdout.write(f"{modulo.propio / 1000:>12.1f} {modulo.acumulado / 1000:>15.1f}  {modulo.nombre}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Arranque: {perfil.segundos * 1000:.0f} ms - Módulos importados: {len(perfil.modulos)}"
+        ))
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from productos.models import Producto
+from productos.series import GRANULARIDADES, reconstruir_series
+
+
+class Command(BaseCommand):
+    help = "Recalcula las series de stock por hora y por día a partir de los movimientos"
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "productos",
+            nargs="*",
+            type=int,
+            help="IDs de productos a recalcular. Por defecto, todos",
+        )
+        parser.add_argument(
+            "--granularidad",
+            choices=GRANULARIDADES,
+            action="append",
+            help="Granularidad a recalcular (se puede repetir). Por defecto, todas",
+        )
+        parser.add_argument(
+            "--lote",
+            type=int,
+            default=500,
+            help="Productos procesados por transacción (por defecto 500)",
+        )
+
+    def handle(self, *args, **options):
+        if options["lote"] <= 0:
+            raise CommandError("--lote debe ser mayor a cero")
+        granularidades = tuple(options["granularidad"] or GRANULARIDADES)
+
+        productos = Producto.objects.order_by("pk").values_list("pk", flat=True)
+        if options["productos"]:
+            productos = productos.filter(pk__in=options["productos"])
+
+        total_productos = total_intervalos = 0
+        lote = []
+        for pk in productos.iterator():
+            lote.append(pk)
+            if len(lote) >= options["lote"]:
+                total_intervalos += reconstruir_series(lote, granularidades)
+                total_productos += len(lote)
+                lote = []
+        if lote:
+            total_intervalos += reconstruir_series(lote, granularidades)
+            total_productos += len(lote)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Productos: {total_productos} - Intervalos: {total_intervalos}"
+        ))
@@ -0,0 +1,56 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from productos.routers import replicas
+
+
+class Command(BaseCommand):
+    help = (
+        "Copia la base SQLite primaria sobre las réplicas configuradas. "
+        "Reemplaza a la replicación real en desarrollo: con réplicas activas "
+        "tiene que correr con --intervalo junto al servidor."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--intervalo",
+            type=float,
+            help="Repite la copia cada N segundos hasta interrumpir con Ctrl+C",
+        )
+
+    def handle(self, *args, **options):
+        primario = settings.DATABASES[DEFAULT_DB_ALIAS]
+        destinos = [settings.DATABASES[alias] for alias in replicas()]
+        for base in [primario, *destinos]:
+            if base["ENGINE"] != "django.db.backends.sqlite3":
+                raise CommandError("sincronizar_replica solo soporta bases SQLite")
+        if not destinos:
+            raise CommandError("No hay réplicas configuradas en INVENTARIO_REPLICAS")
+
+        try:
+            while True:
+                self.sincronizar(primario["NAME"], [destino["NAME"] for destino in destinos])
+                if not options["intervalo"]:
+                    break
+                time.sleep(options["intervalo"])
+        except KeyboardInterrupt:
+            pass
+
+    def sincronizar(self, origen, destinos):
+        inicio = time.perf_counter()
+        # La API de backup copia una instantánea consistente aunque haya escrituras
+        with sqlite3.connect(origen) as conexion_origen:
+            for destino in destinos:
+                conexion_destino = sqlite3.connect(destino)
+                try:
+                    conexion_origen.backup(conexion_destino)
+                finally:
+                    conexion_destino.close()
+        self.stdout.write(
+            f"Réplicas sincronizadas ({len(destinos)}) en {(time.perf_counter() - inicio) * 1000:.0f} ms"
+        )
@@ -0,0 +1,36 @@
+# -----------------------------------------------------------------------------
+# productos/middleware.py
+# -----------------------------------------------------------------------------
+import time
+
+from django.conf import settings
+
+from .routers import forzar_primario
+
+CLAVE_ULTIMA_ESCRITURA = "_productos_ultima_escritura"
+METODOS_SEGUROS = ("GET", "HEAD", "OPTIONS", "TRACE")
+
+
+class PrimarioTrasEscrituraMiddleware:
+    """
+    Mantiene las lecturas de una sesión en el primario durante unos segundos
+    después de que esa sesión escribió (INVENTARIO_PRIMARIO_TRAS_ESCRITURA),
+    para que no vea datos viejos de una réplica atrasada.
+    Va después de SessionMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.ventana = getattr(settings, "INVENTARIO_PRIMARIO_TRAS_ESCRITURA", 5)
+
+    def __call__(self, request):
+        ultima_escritura = request.session.get(CLAVE_ULTIMA_ESCRITURA)
+        if ultima_escritura is not None and time.time() - ultima_escritura < self.ventana:
+            with forzar_primario():
+                response = self.get_response(request)
+        else:
+            response = self.get_response(request)
+
+        if request.method not in METODOS_SEGUROS:
+            request.session[CLAVE_ULTIMA_ESCRITURA] = time.time()
+        return response
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:11
+
+import django.db.models.deletion
+import django.utils.timezone
+import productos.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Producto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('codigo', models.CharField(blank=True, help_text='Codigo interno (SKU). Se usa como clave al importar el catalogo', max_length=50, null=True, unique=True, verbose_name='Codigo')),
+                ('nombre', models.CharField(max_length=50, verbose_name='Nombre')),
+                ('descripcion', models.CharField(max_length=200, verbose_name='Descripcion')),
+                ('precio', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Precio')),
+                ('stock', models.IntegerField(default=0)),
+                ('stock_minimo', models.IntegerField(default=5, verbose_name='Stock Minimo')),
+                ('imagen', models.ImageField(blank=True, help_text='Formatos permitidos: jpg, png, gif. Tamaño maximo: 5MB', null=True, upload_to=productos.models.get_image_path, validators=[productos.models.validate_image_size], verbose_name='Imagen')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creacion')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Fecha de creacion')),
+            ],
+            options={
+                'verbose_name': 'Producto',
+                'verbose_name_plural': 'Productos',
+                'ordering': ['nombre'],
+            },
+        ),
+        migrations.CreateModel(
+            name='MovimientoStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('entrada', 'Entrada'), ('salida', 'Salida'), ('ajuste', 'Ajuste')], max_length=50, verbose_name='Tipo')),
+                ('cantidad', models.IntegerField()),
+                ('motivo', models.CharField(blank=True, max_length=200, null=True, verbose_name='Motivo')),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha')),
+                ('usuario', models.CharField(max_length=50, verbose_name='Usuario')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movimientos', to='productos.producto')),
+            ],
+            options={
+                'verbose_name': 'Movimiento de Stock',
+                'verbose_name_plural': 'Movimientos de Stock',
+                'ordering': ['-fecha'],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0002_indices_historial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SerieStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularidad', models.CharField(choices=[('hora', 'Hora'), ('dia', 'Día')], max_length=10, verbose_name='Granularidad')),
+                ('inicio', models.DateTimeField(verbose_name='Inicio del intervalo')),
+                ('delta_neto', models.IntegerField(default=0, verbose_name='Variación neta')),
+                ('stock_cierre', models.IntegerField(verbose_name='Stock al cierre')),
+                ('producto', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='series', to='productos.producto')),
+            ],
+            options={
+                'verbose_name': 'Serie de Stock',
+                'verbose_name_plural': 'Series de Stock',
+                'ordering': ['producto', 'granularidad', 'inicio'],
+                'constraints': [models.UniqueConstraint(fields=('producto', 'granularidad', 'inicio'), name='serie_stock_unica')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:41
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0004_producto_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CruceStockBajo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stock_anterior', models.IntegerField(verbose_name='Stock anterior')),
+                ('stock', models.IntegerField(verbose_name='Stock')),
+                ('stock_minimo', models.IntegerField(verbose_name='Stock Minimo')),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cruces_stock_bajo', to='productos.producto')),
+            ],
+            options={
+                'verbose_name': 'Cruce de Stock Bajo',
+                'verbose_name_plural': 'Cruces de Stock Bajo',
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-19 09:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0005_cruce_stock_bajo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movimientostock',
+            index=models.Index(fields=['producto', 'tipo', '-fecha', '-id'], name='mov_prod_tipo_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientostock',
+            index=models.Index(fields=['producto', 'usuario', '-fecha', '-id'], name='mov_prod_usuario_fecha_idx'),
+        ),
+    ]
@@ -2,7 +2,6 @@ from django.db import models
 import os
 import uuid
 from django.core.exceptions import ValidationError
-from PIL import Image
 from django.utils import timezone
 
 def validate_image_size(image):
@@ -19,6 +18,14 @@ def get_image_path(instance, filename):
 class Producto(models.Model):
     """Model definition for Producto."""
 
+    codigo = models.CharField(
+        "Codigo",
+        max_length=50,
+        unique=True,
+        blank=True,
+        null=True,
+        help_text="Codigo interno (SKU). Se usa como clave al importar el catalogo"
+    )
     nombre = models.CharField("Nombre", max_length=50)
     descripcion = models.CharField("Descripcion", max_length=200)
     precio = models.DecimalField("Precio", max_digits=10, decimal_places=2)
@@ -34,6 +41,8 @@ class Producto(models.Model):
     )
     fecha_creacion = models.DateTimeField("Fecha de creacion", auto_now_add=True)
     fecha_actualizacion = models.DateTimeField("Fecha de creacion", auto_now=True)
+    # Control de concurrencia optimista: se incrementa en cada modificación
+    version = models.PositiveIntegerField("Version", default=0)
 
     
     class Meta:
@@ -48,11 +57,24 @@ class Producto(models.Model):
         return self.nombre
     
     def save(self, *args, **kwargs):
+        # Un guardado completo de un producto existente incrementa la versión en la
+        # base de datos, así las ediciones abiertas con la versión anterior detectan
+        # el cambio. Con update_fields la versión la maneja quien llama
+        # (ver ProductoUpdateView y los movimientos de stock, que no pasan por acá).
+        incrementar_version = not self._state.adding and kwargs.get("update_fields") is None
+        if incrementar_version:
+            self.version = models.F("version") + 1
         super().save(*args, **kwargs)
+        if incrementar_version:
+            self.refresh_from_db(fields=["version"])
 
         if self.imagen:
+            # Pillow se importa recién acá: los procesos que nunca guardan una
+            # imagen (comandos, workers de la API) no pagan su costo de carga
+            from PIL import Image
+
             try:
-                img = Image.open(self.image.path)
+                img = Image.open(self.imagen.path)
                 if img.height > 300 or img.width > 300:
                     output_size = (300, 300)
                     img.thumbnail(output_size)
@@ -73,7 +95,8 @@ class MovimientoStock(models.Model):
         ("ajuste", "Ajuste"),
     ]
 
-    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='movimientos')
+    # El índice simple de la FK queda cubierto por los índices compuestos de Meta
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='movimientos', db_index=False)
     tipo = models.CharField("Tipo", max_length=50, choices=TIPO_CHOICES)
     cantidad = models.IntegerField()
     motivo = models.CharField("Motivo", max_length=200, blank=True, null=True)
@@ -85,8 +108,79 @@ class MovimientoStock(models.Model):
 
         verbose_name = 'Movimiento de Stock'
         verbose_name_plural = 'Movimientos de Stock'
-        ordering = ["-fecha"]
+        ordering = ["-fecha", "-id"]
+        # Índices para el historial paginado por cursor sobre (fecha, id). El
+        # historial de un producto filtrado por tipo o usuario necesita su
+        # propio índice: con solo (producto, fecha) recorre todo el producto
+        indexes = [
+            models.Index(fields=["producto", "-fecha", "-id"], name="mov_producto_fecha_idx"),
+            models.Index(fields=["producto", "tipo", "-fecha", "-id"], name="mov_prod_tipo_fecha_idx"),
+            models.Index(fields=["producto", "usuario", "-fecha", "-id"], name="mov_prod_usuario_fecha_idx"),
+            models.Index(fields=["-fecha", "-id"], name="mov_fecha_idx"),
+            models.Index(fields=["tipo", "-fecha", "-id"], name="mov_tipo_fecha_idx"),
+            models.Index(fields=["usuario", "-fecha", "-id"], name="mov_usuario_fecha_idx"),
+        ]
 
     def __str__(self):
         """Unicode representation of MovimientoStock."""
         return f"{self.producto.nombre} - {self.tipo}  - {self.cantidad}" 
+
+
+class SerieStock(models.Model):
+    """
+    Model definition for SerieStock.
+    Resumen por intervalo (hora o día) de los movimientos de un producto:
+    variación neta del stock y stock al cierre del intervalo.
+    """
+
+    GRANULARIDAD_CHOICES = [
+        ("hora", "Hora"),
+        ("dia", "Día"),
+    ]
+
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='series', db_index=False)
+    granularidad = models.CharField("Granularidad", max_length=10, choices=GRANULARIDAD_CHOICES)
+    inicio = models.DateTimeField("Inicio del intervalo")
+    delta_neto = models.IntegerField("Variación neta", default=0)
+    stock_cierre = models.IntegerField("Stock al cierre")
+
+    class Meta:
+        """Meta definition for SerieStock."""
+
+        verbose_name = 'Serie de Stock'
+        verbose_name_plural = 'Series de Stock'
+        ordering = ["producto", "granularidad", "inicio"]
+        # La restricción también sirve de índice para leer un rango de la serie
+        constraints = [
+            models.UniqueConstraint(fields=["producto", "granularidad", "inicio"], name="serie_stock_unica"),
+        ]
+
+    def __str__(self):
+        """Unicode representation of SerieStock."""
+        return f"{self.producto_id} - {self.granularidad} - {self.inicio:%Y-%m-%d %H:%M}"
+
+
+class CruceStockBajo(models.Model):
+    """
+    Model definition for CruceStockBajo.
+    Aviso pendiente de que un producto quedó por debajo de su stock mínimo.
+    Se guarda junto con el movimiento y lo borra el comando
+    notificar_stock_bajo una vez enviado en un resumen.
+    """
+
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='cruces_stock_bajo')
+    stock_anterior = models.IntegerField("Stock anterior")
+    stock = models.IntegerField("Stock")
+    stock_minimo = models.IntegerField("Stock Minimo")
+    fecha = models.DateTimeField("Fecha", default=timezone.now)
+
+    class Meta:
+        """Meta definition for CruceStockBajo."""
+
+        verbose_name = 'Cruce de Stock Bajo'
+        verbose_name_plural = 'Cruces de Stock Bajo'
+        ordering = ["id"]
+
+    def __str__(self):
+        """Unicode representation of CruceStockBajo."""
+        return f"{self.producto_id} - {self.stock_anterior} -> {self.stock}"
@@ -0,0 +1,200 @@
+# -----------------------------------------------------------------------------
+# productos/notificaciones.py
+# Avisos de stock bajo. Cuando un movimiento deja a un producto por debajo de
+# su stock mínimo se guarda un CruceStockBajo en la misma transacción que el
+# movimiento. El comando "manage.py notificar_stock_bajo" corre aparte, junta
+# los cruces pendientes (un renglón por producto) y cada INTERVALO segundos
+# envía un resumen a los sinks configurados en INVENTARIO_NOTIFICACIONES.
+# La request que provocó el cruce solo paga un INSERT y los cruces no se
+# pierden si se reinicia un proceso. Sin sinks configurados no se registra nada.
+# -----------------------------------------------------------------------------
+import json
+import logging
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import CruceStockBajo
+
+logger = logging.getLogger(__name__)
+
+CONFIGURACION_POR_DEFECTO = {
+    "INTERVALO": 60,
+    "MAX_POR_RESUMEN": 10000,
+    "SINKS": [],
+}
+
+
+def cruza_stock_minimo(stock_antes, stock_despues, stock_minimo):
+    """True si el stock pasó de estar en o sobre el mínimo a quedar por debajo."""
+    return stock_antes >= stock_minimo > stock_despues
+
+
+def configuracion():
+    """INVENTARIO_NOTIFICACIONES completado con los valores por defecto."""
+    return {**CONFIGURACION_POR_DEFECTO, **getattr(settings, "INVENTARIO_NOTIFICACIONES", {})}
+
+
+def notificaciones_activas():
+    """True si hay al menos un sink configurado."""
+    return bool(configuracion()["SINKS"])
+
+
+def construir_sinks():
+    """Instancia los sinks de INVENTARIO_NOTIFICACIONES."""
+    return [
+        import_string(sink["CLASE"])(**sink.get("OPCIONES", {}))
+        for sink in configuracion()["SINKS"]
+    ]
+
+
+class Resumen:
+    """Resumen de productos que cruzaron el stock mínimo en un intervalo."""
+
+    def __init__(self, items, pendientes=0):
+        self.generado = timezone.now()
+        self.items = items
+        self.pendientes = pendientes
+        # Nombres de los sinks que fallaron al enviarlo
+        self.fallidos = []
+
+    def como_dict(self):
+        return {
+            "generado": self.generado.isoformat(),
+            "pendientes": self.pendientes,
+            "productos": self.items,
+        }
+
+    def como_texto(self):
+        lineas = [f"{len(self.items)} productos quedaron por debajo del stock mínimo:", ""]
+        for item in self.items:
+            lineas.append(
+                f"- {item['nombre']} (stock {item['stock']}, mínimo {item['stock_minimo']}, "
+                f"{item['cruces']} aviso(s))"
+            )
+        if self.pendientes:
+            lineas += ["", f"Quedan {self.pendientes} avisos para el próximo resumen."]
+        return "\n".join(lineas)
+
+
+# -----------------------------------------------------------------------------
+# Sinks: destinos de los resúmenes
+# -----------------------------------------------------------------------------
+class Sink:
+    """Destino de los resúmenes. Las subclases implementan enviar()."""
+
+    def enviar(self, resumen):
+        raise NotImplementedError
+
+
+class ArchivoSink(Sink):
+    """Agrega cada resumen como una línea JSON a un archivo local."""
+
+    def __init__(self, ruta):
+        self.ruta = Path(ruta)
+
+    def enviar(self, resumen):
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        with self.ruta.open("a", encoding="utf-8") as archivo:
+            archivo.write(json.dumps(resumen.como_dict(), ensure_ascii=False) + "\n")
+
+
+class EmailSink(Sink):
+    """Envía el resumen por correo con el EMAIL_BACKEND configurado."""
+
+    def __init__(self, destinatarios, asunto="Productos con stock bajo", remitente=None):
+        self.destinatarios = list(destinatarios)
+        self.asunto = asunto
+        self.remitente = remitente
+
+    def enviar(self, resumen):
+        # Se importa al enviar: el módulo se carga con las señales en cada
+        # proceso y solo el worker de notificaciones manda correos
+        from django.core.mail import send_mail
+
+        send_mail(self.asunto, resumen.como_texto(), self.remitente, self.destinatarios)
+
+
+class WebhookSink(Sink):
+    """Hace un POST con el resumen en JSON a una URL."""
+
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+
+    def enviar(self, resumen):
+        import urllib.request
+
+        pedido = urllib.request.Request(
+            self.url,
+            data=json.dumps(resumen.como_dict()).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(pedido, timeout=self.timeout):
+            pass
+
+
+# -----------------------------------------------------------------------------
+# Registro y envío de cruces
+# -----------------------------------------------------------------------------
+def registrar_cruce(producto, stock_antes, stock_despues):
+    """Guarda un cruce pendiente. Se llama dentro de la transacción del movimiento."""
+    return CruceStockBajo.objects.create(
+        producto=producto,
+        stock_anterior=stock_antes,
+        stock=stock_despues,
+        stock_minimo=producto.stock_minimo,
+    )
+
+
+def enviar_resumen(sinks, max_cruces=None):
+    """
+    Envía en un resumen los cruces pendientes más viejos (hasta max_cruces) y
+    los borra. Varios cruces del mismo producto generan un solo renglón.
+    Los errores de un sink se registran y no frenan a los demás; si alguno
+    falla los cruces se conservan y vuelven a salir en el próximo resumen
+    (los sinks que sí lo recibieron pueden recibirlos dos veces).
+    Devuelve el Resumen enviado o None si no había cruces.
+    """
+    max_cruces = max_cruces or configuracion()["MAX_POR_RESUMEN"]
+    cruces = list(CruceStockBajo.objects.select_related("producto").order_by("id")[:max_cruces])
+    if not cruces:
+        return None
+
+    items = {}
+    for cruce in cruces:
+        item = items.get(cruce.producto_id)
+        if item is not None:
+            item["stock"] = cruce.stock
+            item["cruces"] += 1
+            continue
+        items[cruce.producto_id] = {
+            "producto": cruce.producto_id,
+            "codigo": cruce.producto.codigo,
+            "nombre": cruce.producto.nombre,
+            "stock_anterior": cruce.stock_anterior,
+            "stock": cruce.stock,
+            "stock_minimo": cruce.stock_minimo,
+            "cruces": 1,
+            "primer_cruce": cruce.fecha.isoformat(),
+        }
+    pendientes = CruceStockBajo.objects.filter(id__gt=cruces[-1].id).count()
+
+    resumen = Resumen(sorted(items.values(), key=lambda item: item["nombre"]), pendientes)
+    for sink in sinks:
+        try:
+            sink.enviar(resumen)
+        except Exception:
+            logger.exception("Error al enviar el resumen de stock bajo con %s", type(sink).__name__)
+            resumen.fallidos.append(type(sink).__name__)
+    if resumen.fallidos:
+        return resumen
+    # Se borran exactamente los enviados: un cruce de una transacción más
+    # lenta puede confirmarse después con un id menor
+    ids = [cruce.id for cruce in cruces]
+    for inicio in range(0, len(ids), 500):
+        CruceStockBajo.objects.filter(id__in=ids[inicio:inicio + 500]).delete()
+    return resumen
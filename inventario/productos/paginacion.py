@@ -0,0 +1,83 @@
+# -----------------------------------------------------------------------------
+# productos/paginacion.py
+# Paginación por cursor (keyset) para el historial de movimientos.
+# En lugar de OFFSET se filtra por la clave (fecha, id) del último elemento
+# visto, así una página profunda cuesta lo mismo que la primera mientras
+# exista un índice compuesto que termine en (fecha, id).
+# -----------------------------------------------------------------------------
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+SIGUIENTE = "siguiente"
+ANTERIOR = "anterior"
+
+
+def codificar_cursor(fecha, pk):
+    """Codifica la clave (fecha, id) de un movimiento en un cursor opaco."""
+    valor = f"{fecha.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(valor.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor):
+    """Devuelve la tupla (fecha, id) de un cursor. Lanza ValueError si es inválido."""
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        valor = base64.urlsafe_b64decode(cursor + relleno).decode()
+        fecha, pk = valor.rsplit("|", 1)
+        return datetime.fromisoformat(fecha), int(pk)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Cursor inválido") from e
+
+
+class PaginaKeyset:
+    """Una página de resultados con los cursores para navegar."""
+
+    def __init__(self, items, hay_siguiente, hay_anterior):
+        self.items = items
+        self.hay_siguiente = hay_siguiente
+        self.hay_anterior = hay_anterior
+
+    @property
+    def cursor_siguiente(self):
+        if self.hay_siguiente and self.items:
+            return codificar_cursor(self.items[-1].fecha, self.items[-1].pk)
+        return None
+
+    @property
+    def cursor_anterior(self):
+        if self.hay_anterior and self.items:
+            return codificar_cursor(self.items[0].fecha, self.items[0].pk)
+        return None
+
+
+def paginar_keyset(queryset, cursor=None, direccion=SIGUIENTE, tamanio=50):
+    """
+    Pagina un queryset de movimientos del más nuevo al más viejo por (fecha, id).
+    'siguiente' devuelve los elementos posteriores al cursor y 'anterior' los
+    previos. Lanza ValueError si el cursor o la dirección no son válidos.
+    """
+    if direccion not in (SIGUIENTE, ANTERIOR):
+        raise ValueError("Dirección inválida")
+
+    if cursor is None:
+        items = list(queryset.order_by("-fecha", "-id")[:tamanio + 1])
+        return PaginaKeyset(items[:tamanio], len(items) > tamanio, False)
+
+    fecha, pk = decodificar_cursor(cursor)
+    # El OR solo no le da a SQLite un límite de rango sobre 'fecha' y termina
+    # recorriendo todas las filas anteriores al cursor. La cota redundante
+    # (fecha <= cursor / fecha >= cursor) permite buscar directo en el índice.
+    if direccion == SIGUIENTE:
+        queryset = queryset.filter(fecha__lte=fecha).filter(Q(fecha__lt=fecha) | Q(fecha=fecha, id__lt=pk))
+        items = list(queryset.order_by("-fecha", "-id")[:tamanio + 1])
+        return PaginaKeyset(items[:tamanio], len(items) > tamanio, True)
+
+    # Hacia atrás se recorre el índice en orden ascendente y se invierte la página
+    queryset = queryset.filter(fecha__gte=fecha).filter(Q(fecha__gt=fecha) | Q(fecha=fecha, id__gt=pk))
+    items = list(queryset.order_by("fecha", "id")[:tamanio + 1])
+    hay_anterior = len(items) > tamanio
+    items = items[:tamanio]
+    items.reverse()
+    return PaginaKeyset(items, True, hay_anterior)
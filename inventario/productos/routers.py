@@ -0,0 +1,151 @@
+# -----------------------------------------------------------------------------
+# productos/routers.py
+# Ruteo de lecturas a réplicas. Solo las lecturas de los modelos de productos
+# hechas dentro de lectura_en_replica() (vistas de listados, reportes y
+# exportaciones) van a una réplica. Todo lo demás, las lecturas de una sesión
+# que acaba de escribir y las de una réplica que todavía no recibió el esquema
+# van al primario ("default"). Las réplicas se activan con INVENTARIO_REPLICAS.
+# -----------------------------------------------------------------------------
+import contextvars
+import logging
+import os
+import random
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+# (alias, motivo) elegido al entrar a lectura_en_replica(); None fuera del bloque
+_lectura_replica = contextvars.ContextVar("productos_lectura_replica", default=None)
+_forzar_primario = contextvars.ContextVar("productos_forzar_primario", default=False)
+
+_estadisticas = Counter()
+_estadisticas_lock = threading.Lock()
+
+# Réplicas que ya tienen las tablas de productos. Solo se guardan las listas:
+# una réplica que todavía no se sincronizó se vuelve a revisar en cada bloque
+_replicas_listas = set()
+
+
+def replicas():
+    """Alias de las réplicas configuradas en INVENTARIO_REPLICAS."""
+    return [alias for alias in getattr(settings, "INVENTARIO_REPLICAS", []) if alias in settings.DATABASES]
+
+
+def _replica_disponible(alias):
+    """True si la réplica existe y tiene las tablas de la app (ya se sincronizó)."""
+    if alias in _replicas_listas:
+        return True
+    conexion = connections[alias]
+    # SQLite crearía un archivo vacío al conectarse a una réplica que no existe
+    if conexion.vendor == "sqlite" and not conexion.is_in_memory_db() and not os.path.exists(
+        conexion.settings_dict["NAME"]
+    ):
+        return False
+    try:
+        with conexion.cursor() as cursor:
+            tablas = set(conexion.introspection.table_names(cursor))
+    except DatabaseError:
+        return False
+    if not {model._meta.db_table for model in apps.get_app_config("productos").get_models()} <= tablas:
+        return False
+    _replicas_listas.add(alias)
+    return True
+
+
+def _elegir_replica():
+    """Devuelve (alias, motivo) para las lecturas de un bloque."""
+    configuradas = replicas()
+    if not configuradas:
+        return DEFAULT_DB_ALIAS, "sin_replicas"
+    disponibles = [alias for alias in configuradas if _replica_disponible(alias)]
+    if not disponibles:
+        return DEFAULT_DB_ALIAS, "replica_no_disponible"
+    return random.choice(disponibles), "replica"
+
+
+@contextmanager
+def lectura_en_replica():
+    """
+    Marca el bloque como de solo lectura: sus consultas pueden ir a una réplica.
+    La réplica se elige una vez por bloque, así una misma vista no mezcla datos
+    de réplicas con distinto atraso.
+    """
+    token = _lectura_replica.set(_elegir_replica())
+    try:
+        yield
+    finally:
+        _lectura_replica.reset(token)
+
+
+@contextmanager
+def forzar_primario():
+    """Obliga a leer del primario, por ejemplo después de una escritura."""
+    token = _forzar_primario.set(True)
+    try:
+        yield
+    finally:
+        _forzar_primario.reset(token)
+
+
+def _registrar(alias, motivo, model):
+    with _estadisticas_lock:
+        _estadisticas[(alias, motivo)] += 1
+    logger.debug("Lectura de %s ruteada a '%s' (%s)", model._meta.label, alias, motivo)
+
+
+def estadisticas_ruteo():
+    """Devuelve una copia de los contadores {(alias, motivo): cantidad}."""
+    with _estadisticas_lock:
+        return dict(_estadisticas)
+
+
+def reiniciar_estadisticas():
+    with _estadisticas_lock:
+        _estadisticas.clear()
+
+
+class ReplicaRouter:
+    """Router de base de datos para separar lecturas (réplicas) de escrituras (primario)."""
+
+    app_label = "productos"
+
+    def db_for_read(self, model, **hints):
+        eleccion = _lectura_replica.get()
+        if model._meta.app_label != self.app_label or eleccion is None:
+            return None
+        if _forzar_primario.get():
+            _registrar(DEFAULT_DB_ALIAS, "escritura_reciente", model)
+            return DEFAULT_DB_ALIAS
+        alias, motivo = eleccion
+        _registrar(alias, motivo, model)
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primario y réplicas tienen los mismos datos
+        alias_validos = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in alias_validos and obj2._state.db in alias_validos:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Las réplicas reciben el esquema junto con los datos desde el primario
+        if db in replicas():
+            return False
+        return None
+
+
+@receiver(setting_changed)
+def _olvidar_replicas_listas(setting, **kwargs):
+    if setting in ("DATABASES", "INVENTARIO_REPLICAS"):
+        _replicas_listas.clear()
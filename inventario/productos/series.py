@@ -0,0 +1,222 @@
+# -----------------------------------------------------------------------------
+# productos/series.py
+# Series de stock por hora y por día para los gráficos de stock en el tiempo.
+# Cada movimiento suma su variación al intervalo que le corresponde, así un
+# gráfico lee O(intervalos) filas en lugar de recorrer todo el libro de
+# movimientos. El stock al cierre se ancla en Producto.stock: la primera vez
+# que un producto entra a las series se parte de un saldo de apertura
+# (stock - suma de sus movimientos), que cubre el stock anterior al libro de
+# movimientos, y después cada intervalo es el cierre del anterior más su
+# variación. Los cambios directos de stock (admin) registran un movimiento.
+# -----------------------------------------------------------------------------
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Sum, When
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from . import insercion
+from .models import Producto, MovimientoStock, SerieStock
+
+GRANULARIDADES = ("hora", "dia")
+_TRUNC = {"hora": "hour", "dia": "day"}
+
+
+def delta_movimiento(tipo, cantidad):
+    """Variación de stock de un movimiento. Los de tipo 'ajuste' no mueven stock."""
+    if tipo == "entrada":
+        return cantidad
+    if tipo == "salida":
+        return -cantidad
+    return 0
+
+
+def inicio_intervalo(fecha, granularidad):
+    """Trunca una fecha al inicio de su hora o de su día (en la zona horaria actual)."""
+    fecha = timezone.localtime(fecha).replace(minute=0, second=0, microsecond=0)
+    if granularidad == "dia":
+        fecha = fecha.replace(hour=0)
+    return fecha
+
+
+def registrar_movimientos(movimientos):
+    """
+    Actualiza las series a partir de movimientos recién escritos.
+    Recibe tuplas (producto_id, fecha, delta); los movimientos ya tienen que
+    estar guardados. El stock al cierre se deriva del intervalo anterior más
+    la variación, así no depende de quién escribió el movimiento ni de en qué
+    orden guardó el producto. Los intervalos existentes se incrementan con
+    F() y los que faltan se crean. Los productos que todavía no tienen series
+    se reconstruyen desde Producto.stock.
+    """
+    acumulado = _acumular(movimientos)
+    if not acumulado:
+        return
+
+    existentes = set(
+        SerieStock.objects.filter(
+            producto_id__in={clave[0] for clave in acumulado},
+            inicio__in={clave[2] for clave in acumulado},
+        ).values_list("producto_id", "granularidad", "inicio")
+    )
+    faltantes = {clave[0] for clave in acumulado if clave not in existentes}
+    if faltantes:
+        # Solo cuando hay que crear un intervalo: ¿el producto ya tiene series?
+        sin_series = faltantes - set(
+            SerieStock.objects.filter(producto_id__in=faltantes).values_list("producto_id", flat=True).distinct()
+        )
+        if sin_series:
+            reconstruir_series(sin_series)
+            acumulado = {clave: delta for clave, delta in acumulado.items() if clave[0] not in sin_series}
+
+    for clave in sorted(acumulado, key=lambda clave: clave[2]):
+        if clave in existentes:
+            _sumar_a_intervalo(clave, acumulado[clave])
+        else:
+            _crear_intervalo(clave, acumulado[clave])
+
+
+def crear_series_iniciales(movimientos):
+    """
+    Crea en bloque las series de productos que todavía no tienen ninguna
+    (por ejemplo, los recién creados por la importación del catálogo).
+    Recibe tuplas (producto_id, fecha, delta). Todo el stock de un producto
+    nuevo viene de estos movimientos (saldo de apertura cero), así que no hace
+    falta consultar la base. Se escribe con executemany, como el resto de la
+    importación.
+    """
+    acumulado = _acumular(movimientos)
+    cierre = {}
+    inicios = {}
+    intervalos = []
+    for clave in sorted(acumulado, key=lambda clave: clave[2]):
+        serie = clave[:2]
+        cierre[serie] = cierre.get(serie, 0) + acumulado[clave]
+        if clave[2] not in inicios:
+            inicios[clave[2]] = insercion.adaptar_fecha(clave[2])
+        intervalos.append((clave[0], clave[1], inicios[clave[2]], acumulado[clave], cierre[serie]))
+    if intervalos:
+        insercion.insertar(
+            SerieStock, ["producto", "granularidad", "inicio", "delta_neto", "stock_cierre"], intervalos
+        )
+
+
+def _acumular(movimientos):
+    """Agrupa las variaciones por (producto_id, granularidad, inicio)."""
+    acumulado = {}
+    # En un lote de la importación todos los movimientos comparten la fecha:
+    # se trunca una vez por fecha y no una vez por movimiento
+    inicios = {}
+    for producto_id, fecha, delta in movimientos:
+        if fecha not in inicios:
+            inicios[fecha] = [(g, inicio_intervalo(fecha, g)) for g in GRANULARIDADES]
+        for granularidad, inicio in inicios[fecha]:
+            clave = (producto_id, granularidad, inicio)
+            acumulado[clave] = acumulado.get(clave, 0) + delta
+    return acumulado
+
+
+def _sumar_a_intervalo(clave, delta):
+    """
+    Suma la variación al intervalo y corre el cierre de los posteriores, por si
+    el movimiento llega con una fecha anterior a otros ya registrados. En el
+    caso normal (el último intervalo) el UPDATE toca una sola fila.
+    """
+    producto_id, granularidad, inicio = clave
+    return SerieStock.objects.filter(
+        producto_id=producto_id, granularidad=granularidad, inicio__gte=inicio
+    ).update(
+        delta_neto=Case(When(inicio=inicio, then=F("delta_neto") + delta), default=F("delta_neto")),
+        stock_cierre=F("stock_cierre") + delta,
+    )
+
+
+def _crear_intervalo(clave, delta):
+    """Crea un intervalo a partir del cierre del anterior (o del saldo de apertura si es el primero)."""
+    producto_id, granularidad, inicio = clave
+    serie = SerieStock.objects.filter(producto_id=producto_id, granularidad=granularidad)
+    anterior = serie.filter(inicio__lt=inicio).order_by("-inicio").values_list("stock_cierre", flat=True).first()
+    if anterior is None:
+        # Movimiento con fecha anterior a toda la serie: el saldo de apertura
+        # es el cierre del primer intervalo menos su variación
+        siguiente = serie.filter(inicio__gt=inicio).order_by("inicio").values_list("stock_cierre", "delta_neto").first()
+        anterior = siguiente[0] - siguiente[1] if siguiente else 0
+    try:
+        with transaction.atomic():
+            SerieStock.objects.create(
+                producto_id=producto_id,
+                granularidad=granularidad,
+                inicio=inicio,
+                delta_neto=delta,
+                stock_cierre=anterior + delta,
+            )
+    except IntegrityError:
+        # Otro proceso creó el intervalo mientras tanto
+        _sumar_a_intervalo(clave, delta)
+        return
+    SerieStock.objects.filter(
+        producto_id=producto_id, granularidad=granularidad, inicio__gt=inicio
+    ).update(stock_cierre=F("stock_cierre") + delta)
+
+
+def registrar_movimiento(movimiento):
+    """Actualiza las series con un único movimiento."""
+    registrar_movimientos([(
+        movimiento.producto_id,
+        movimiento.fecha,
+        delta_movimiento(movimiento.tipo, movimiento.cantidad),
+    )])
+
+
+def reconstruir_series(productos_ids, granularidades=GRANULARIDADES):
+    """
+    Recalcula desde cero las series de los productos indicados agregando
+    sus movimientos en la base de datos. Cada serie parte del saldo de
+    apertura (stock actual menos la suma de los movimientos), así el último
+    cierre coincide con Producto.stock aunque el stock sea anterior al libro.
+    Devuelve la cantidad de intervalos creados.
+    """
+    delta = Sum(Case(
+        When(tipo="entrada", then=F("cantidad")),
+        When(tipo="salida", then=-F("cantidad")),
+        default=0,
+    ))
+    apertura = dict(Producto.objects.filter(pk__in=productos_ids).values_list("pk", "stock"))
+    productos_ids = list(apertura)
+    totales = (
+        MovimientoStock.objects.filter(producto_id__in=productos_ids)
+        .values("producto_id")
+        .annotate(delta=delta)
+        .order_by()
+    )
+    for fila in totales:
+        apertura[fila["producto_id"]] -= fila["delta"]
+
+    nuevas = []
+    for granularidad in granularidades:
+        filas = (
+            MovimientoStock.objects.filter(producto_id__in=productos_ids)
+            .annotate(inicio=Trunc("fecha", _TRUNC[granularidad]))
+            .values("producto_id", "inicio")
+            .annotate(delta=delta)
+            .order_by("producto_id", "inicio")
+        )
+        producto_id = stock = None
+        for fila in filas:
+            if fila["producto_id"] != producto_id:
+                producto_id = fila["producto_id"]
+                stock = apertura[producto_id]
+            stock += fila["delta"]
+            nuevas.append(SerieStock(
+                producto_id=producto_id,
+                granularidad=granularidad,
+                inicio=fila["inicio"],
+                delta_neto=fila["delta"],
+                stock_cierre=stock,
+            ))
+
+    with transaction.atomic():
+        SerieStock.objects.filter(
+            producto_id__in=productos_ids, granularidad__in=granularidades
+        ).delete()
+        SerieStock.objects.bulk_create(nuevas, batch_size=1000)
+    return len(nuevas)
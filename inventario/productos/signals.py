@@ -0,0 +1,35 @@
+# -----------------------------------------------------------------------------
+# productos/signals.py
+# Receptores de señales de la aplicación. Se conectan en ProductosConfig.ready().
+# -----------------------------------------------------------------------------
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from . import notificaciones, series
+from .models import MovimientoStock
+
+
+@receiver(post_save, sender=MovimientoStock, dispatch_uid="productos_movimiento_series")
+def actualizar_series_stock(sender, instance, created, raw=False, **kwargs):
+    """Suma cada movimiento nuevo a las series de stock."""
+    if not created or raw:
+        return
+    series.registrar_movimiento(instance)
+
+
+@receiver(post_save, sender=MovimientoStock, dispatch_uid="productos_movimiento_stock_bajo")
+def detectar_stock_bajo(sender, instance, created, raw=False, **kwargs):
+    """
+    Compara el stock antes y después del movimiento (sin consultar la base)
+    y, si cruzó el stock mínimo, guarda el cruce en la misma transacción:
+    se confirma o se descarta junto con el movimiento.
+    """
+    if not created or raw:
+        return
+    producto = instance.producto
+    stock_antes = producto.stock - series.delta_movimiento(instance.tipo, instance.cantidad)
+    if (
+        notificaciones.cruza_stock_minimo(stock_antes, producto.stock, producto.stock_minimo)
+        and notificaciones.notificaciones_activas()
+    ):
+        notificaciones.registrar_cruce(producto, stock_antes, producto.stock)
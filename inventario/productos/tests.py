@@ -1,3 +1,568 @@
-from django.test import TestCase
+import io
+import json
+import random
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.db import connection, connections
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import notificaciones, series
+from .arranque import medir_arranque
+from .routers import estadisticas_ruteo, lectura_en_replica, reiniciar_estadisticas
+from .importacion import importar_productos
+from .models import CruceStockBajo, Producto, MovimientoStock, SerieStock
+from .paginacion import ANTERIOR, SIGUIENTE, codificar_cursor, paginar_keyset
+
+
+class ImportacionProductosTests(TestCase):
+    CSV = (
+        "codigo,nombre,descripcion,precio,stock,stock_minimo\n"
+        "A1,Tornillo,Tornillo 3mm,10.50,100,10\n"
+        "A2,Tuerca,Tuerca 3mm,5,0,\n"
+        "A3,Arandela,Arandela,-1,5,1\n"
+        "A4,Clavo,,2,5,1\n"
+    )
+
+    def test_importa_csv_y_registra_stock_inicial(self):
+        resultado = importar_productos(io.BytesIO(self.CSV.encode()), "csv", tamanio_lote=1)
+
+        self.assertEqual(resultado.creados, 2)
+        self.assertEqual(resultado.total_errores, 2)
+        self.assertEqual([linea for linea, _ in resultado.errores], [4, 5])
+
+        tornillo = Producto.objects.get(codigo="A1")
+        self.assertEqual(tornillo.precio, Decimal("10.50"))
+        self.assertEqual(Producto.objects.get(codigo="A2").stock_minimo, 5)
+
+        # Solo el producto con stock inicial genera movimiento
+        movimiento = MovimientoStock.objects.get()
+        self.assertEqual(movimiento.producto, tornillo)
+        self.assertEqual((movimiento.tipo, movimiento.cantidad), ("entrada", 100))
+        self.assertEqual(movimiento.motivo, "Stock inicial")
+        self.assertEqual(
+            list(SerieStock.objects.values_list("producto", "stock_cierre")), [(tornillo.pk, 100)] * 2
+        )
+
+    def test_upsert_actualiza_sin_pisar_stock(self):
+        Producto.objects.create(codigo="A1", nombre="Viejo", descripcion="x", precio=1, stock=7)
+        jsonl = (
+            '{"codigo": "A1", "nombre": "Nuevo", "descripcion": "y", "precio": 2.25, "stock": 50}\n'
+            "\n"
+            "no es json\n"
+        )
+        resultado = importar_productos(io.BytesIO(jsonl.encode()), "jsonl")
+
+        self.assertEqual((resultado.creados, resultado.actualizados), (0, 1))
+        self.assertEqual(resultado.errores[0][0], 3)
+        producto = Producto.objects.get(codigo="A1")
+        self.assertEqual(producto.nombre, "Nuevo")
+        self.assertEqual(producto.precio, Decimal("2.25"))
+        self.assertEqual(producto.stock, 7)
+        self.assertEqual(producto.version, 1)
+        self.assertFalse(MovimientoStock.objects.exists())
+
+    def test_enteros_invalidos_son_errores_de_fila(self):
+        filas = [
+            {"stock": 1.9}, {"stock_minimo": True}, {"stock": 99999999999999999999999},
+            {"stock": "1e30"}, {"stock": [1]}, {"stock": 2.0, "stock_minimo": "3"},
+        ]
+        jsonl = "".join(
+            json.dumps({"codigo": f"E{i}", "nombre": "x", "descripcion": "x", "precio": 1, **fila}) + "\n"
+            for i, fila in enumerate(filas)
+        )
+        resultado = importar_productos(io.BytesIO(jsonl.encode()), "jsonl")
+
+        self.assertEqual([linea for linea, _ in resultado.errores], [1, 2, 3, 4, 5])
+        self.assertIn("entero", resultado.errores[0][1])
+        self.assertIn("debe estar entre", resultado.errores[2][1])
+        producto = Producto.objects.get()
+        self.assertEqual((producto.codigo, producto.stock, producto.stock_minimo), ("E5", 2, 3))
+
+    def test_archivo_ilegible(self):
+        with self.assertRaisesMessage(CommandError, "UTF-8"):
+            with tempfile.NamedTemporaryFile(suffix=".csv") as archivo:
+                archivo.write("codigo,nombre\nA1,Ñandú\n".encode("latin-1"))
+                archivo.flush()
+                call_command("import_productos", archivo.name, stdout=io.StringIO())
+
+        # Un campo que supera csv.field_size_limit() provoca csv.Error
+        archivo = SimpleUploadedFile("catalogo.csv", b"codigo,nombre\nA1," + b"x" * 200000 + b"\n")
+        response = self.client.post(reverse("productos:producto_import"), {"archivo": archivo})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("CSV mal formado", str(response.context["form"].errors["archivo"]))
+
+    def test_vista_importar(self):
+        archivo = SimpleUploadedFile("catalogo.csv", self.CSV.encode())
+        response = self.client.post(reverse("productos:producto_import"), {"archivo": archivo})
+
+        self.assertRedirects(response, reverse("productos:producto_list"), fetch_redirect_response=False)
+        self.assertEqual(Producto.objects.count(), 2)
+
+
+# Sin réplicas: TestCase no deja ver sus datos desde otra conexión
+@override_settings(INVENTARIO_REPLICAS=[])
+class HistorialMovimientosTests(TestCase):
+    def setUp(self):
+        self.producto = Producto.objects.create(codigo="H1", nombre="Tornillo", descripcion="x", precio=1)
+        otro = Producto.objects.create(codigo="H2", nombre="Tuerca", descripcion="x", precio=1)
+        base = datetime(2026, 1, 10, 12, tzinfo=dt_timezone.utc)
+        # Varios movimientos comparten fecha para ejercitar el desempate por id
+        for i in range(7):
+            MovimientoStock.objects.create(
+                producto=self.producto,
+                tipo="entrada" if i % 2 else "salida",
+                cantidad=i + 1,
+                fecha=base + timedelta(days=i // 2),
+                usuario="ana" if i < 4 else "juan",
+            )
+        MovimientoStock.objects.create(producto=otro, tipo="entrada", cantidad=1, fecha=base, usuario="ana")
+        self.url = reverse("productos:producto_movimiento_historial_api", args=[self.producto.pk])
+
+    def _recorrer(self, params):
+        ids, cursor = [], None
+        while True:
+            datos = self.client.get(self.url, {**params, "limite": 3, **({"cursor": cursor} if cursor else {})}).json()
+            ids += [r["id"] for r in datos["resultados"]]
+            cursor = datos["siguiente"]
+            if not cursor:
+                return ids, datos
+
+    def test_paginacion_recorre_todo_en_orden(self):
+        esperado = list(
+            MovimientoStock.objects.filter(producto=self.producto).order_by("-fecha", "-id").values_list("id", flat=True)
+        )
+        ids, ultima = self._recorrer({})
+        self.assertEqual(ids, esperado)
+
+        # Volver una página desde la última devuelve la anterior
+        anterior = self.client.get(self.url, {"limite": 3, "cursor": ultima["anterior"], "direccion": "anterior"}).json()
+        self.assertEqual([r["id"] for r in anterior["resultados"]], esperado[3:6])
+        self.assertIsNone(
+            self.client.get(self.url, {"limite": 3, "cursor": anterior["anterior"], "direccion": "anterior"}).json()["anterior"]
+        )
+
+    def test_filtros(self):
+        ids, _ = self._recorrer({"tipo": "entrada", "usuario": "ana", "desde": "2026-01-10", "hasta": "2026-01-11"})
+        self.assertEqual(
+            set(ids),
+            set(MovimientoStock.objects.filter(
+                producto=self.producto, tipo="entrada", usuario="ana"
+            ).values_list("id", flat=True)),
+        )
+
+    def test_paginas_profundas_usan_rango_en_el_indice(self):
+        cursor = codificar_cursor(timezone.now(), 5)
+        movimientos = MovimientoStock.objects.filter(producto=self.producto)
+        casos = [
+            (movimientos, SIGUIENTE, '"fecha" <=', "fecha<", "mov_producto_fecha_idx"),
+            (movimientos, ANTERIOR, '"fecha" >=', "fecha>", "mov_producto_fecha_idx"),
+            (MovimientoStock.objects.all(), SIGUIENTE, '"fecha" <=', "fecha<", "mov_fecha_idx"),
+            # Historial de un producto filtrado: igualdad en las dos columnas y rango en fecha
+            (movimientos.filter(tipo="salida"), SIGUIENTE, '"fecha" <=', "fecha<", "mov_prod_tipo_fecha_idx"),
+            (movimientos.filter(usuario="ana"), ANTERIOR, '"fecha" >=', "fecha>", "mov_prod_usuario_fecha_idx"),
+        ]
+        for queryset, direccion, cota_sql, cota_plan, indice in casos:
+            with CaptureQueriesContext(connection) as consultas:
+                paginar_keyset(queryset, cursor, direccion, tamanio=3)
+            sql = consultas[-1]["sql"]
+            # La cota redundante tiene que estar en el SQL: algunas versiones de
+            # SQLite no derivan un rango del OR por sí solas
+            self.assertIn(cota_sql, sql)
+            with connection.cursor() as cursor_db:
+                cursor_db.execute("EXPLAIN QUERY PLAN " + sql)
+                plan = " ".join(str(fila[-1]) for fila in cursor_db.fetchall())
+            self.assertIn("SEARCH", plan)
+            self.assertIn(f"INDEX {indice} ", plan)
+            self.assertIn(cota_plan, plan)
+            self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_cursor_invalido(self):
+        self.assertEqual(self.client.get(self.url, {"cursor": "xx"}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"limite": "0"}).status_code, 400)
+
+    def test_vista_html(self):
+        response = self.client.get(reverse("productos:movimiento_historial"), {"tipo": "salida"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["movimientos"]), 4)
+
+
+# Sin réplicas: TestCase no deja ver sus datos desde otra conexión
+@override_settings(INVENTARIO_REPLICAS=[])
+class SerieStockTests(TestCase):
+    def setUp(self):
+        self.producto = Producto.objects.create(codigo="S1", nombre="Tornillo", descripcion="x", precio=1)
+
+    def _mover(self, tipo, cantidad, fecha):
+        self.producto.stock += series.delta_movimiento(tipo, cantidad)
+        self.producto.save()
+        MovimientoStock.objects.create(producto=self.producto, tipo=tipo, cantidad=cantidad, fecha=fecha, usuario="ana")
+
+    def _serie(self, granularidad):
+        return list(
+            SerieStock.objects.filter(producto=self.producto, granularidad=granularidad)
+            .order_by("inicio").values_list("delta_neto", "stock_cierre")
+        )
+
+    def test_incremental_y_reconstruccion_coinciden(self):
+        base = datetime(2026, 3, 1, 10, 15, tzinfo=dt_timezone.utc)
+        self._mover("entrada", 10, base)
+        self._mover("salida", 3, base + timedelta(minutes=20))
+        self._mover("ajuste", 99, base + timedelta(hours=1))
+        self._mover("entrada", 5, base + timedelta(days=1))
+
+        horas, dias = self._serie("hora"), self._serie("dia")
+        self.assertEqual(horas, [(7, 7), (0, 7), (5, 12)])
+        self.assertEqual(dias, [(7, 7), (5, 12)])
+
+        SerieStock.objects.all().delete()
+        call_command("reconstruir_series", stdout=io.StringIO())
+        self.assertEqual(self._serie("hora"), horas)
+        self.assertEqual(self._serie("dia"), dias)
+
+    def test_movimiento_con_fecha_anterior(self):
+        # Como las vistas: el stock se actualiza con F() y después se crea el movimiento
+        base = datetime(2026, 3, 1, 10, tzinfo=dt_timezone.utc)
+        for tipo, cantidad, horas in (("entrada", 10, 0), ("salida", 4, 2), ("entrada", 1, 1), ("entrada", 2, -1)):
+            Producto.objects.filter(pk=self.producto.pk).update(stock=F("stock") + series.delta_movimiento(tipo, cantidad))
+            MovimientoStock.objects.create(
+                producto=self.producto, tipo=tipo, cantidad=cantidad, fecha=base + timedelta(hours=horas), usuario="x"
+            )
+        # La hora 1 toma el cierre de la hora 0 y corre el de la hora 2; la hora -1 parte de la apertura
+        self.assertEqual(self._serie("hora"), [(2, 2), (10, 12), (1, 13), (-4, 9)])
+        self.assertEqual(self._serie("dia"), [(9, 9)])
+
+    def test_stock_anterior_al_libro_de_movimientos(self):
+        # Producto con stock cargado sin movimiento de apertura
+        self.producto.stock = 10
+        self.producto.save()
+        self.client.post(reverse("productos:movimiento_create", args=[self.producto.pk]), {"tipo": "salida", "cantidad": 2})
+        self.assertEqual(self._serie("dia"), [(-2, 8)])
+
+        SerieStock.objects.all().delete()
+        call_command("reconstruir_series", stdout=io.StringIO())
+        self.assertEqual(self._serie("dia"), [(-2, 8)])
+
+    def test_cambio_de_stock_desde_el_admin(self):
+        admin = User.objects.create_superuser("admin", "admin@example.com", "x")
+        self.client.force_login(admin)
+        url = reverse("admin:productos_producto_change", args=[self.producto.pk])
+        datos = {"codigo": "S1", "nombre": "Tornillo", "descripcion": "x", "precio": "1", "stock_minimo": 5}
+        self.client.post(reverse("admin:productos_producto_add"), {**datos, "codigo": "S2", "stock": 4})
+        self.client.post(url, {**datos, "stock": 10})
+        self.client.post(url, {**datos, "stock": 3})
+
+        self.assertEqual(
+            list(MovimientoStock.objects.order_by("id").values_list("producto__codigo", "tipo", "cantidad", "motivo")),
+            [("S2", "entrada", 4, "Stock inicial"), ("S1", "entrada", 10, "Ajuste desde el admin"),
+             ("S1", "salida", 7, "Ajuste desde el admin")],
+        )
+        api = self.client.get(reverse("productos:serie_stock_api", args=[self.producto.pk])).json()
+        self.assertEqual((api["stock"], api["stock_actual"]), ([3], 3))
+
+    def test_ajuste_de_stock_actualiza_la_serie(self):
+        self.client.post(reverse("productos:ajustar_stock", args=[self.producto.pk]), {"cantidad": 8})
+        self.assertEqual(self._serie("dia"), [(8, 8)])
+
+    def test_api_columnar(self):
+        base = datetime(2026, 3, 1, tzinfo=dt_timezone.utc)
+        self._mover("entrada", 4, base)
+        self._mover("entrada", 1, base + timedelta(days=2))
+        url = reverse("productos:serie_stock_api", args=[self.producto.pk])
+
+        datos = self.client.get(url, {"desde": "2026-03-02"}).json()
+        self.assertEqual(datos["inicio"], [int((base + timedelta(days=2)).timestamp())])
+        self.assertEqual((datos["delta"], datos["stock"]), ([1], [5]))
+        self.assertEqual(self.client.get(url, {"granularidad": "mes"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"hasta": "2026-02-31"}).status_code, 400)
+
+
+class ArranqueTests(SimpleTestCase):
+    # Presupuesto para el arranque en frío de un worker (django.setup() + URLconf)
+    PRESUPUESTO_SEGUNDOS = 1.5
+    # urllib.request lo usa solo WebhookSink; django.core.mail no figura porque
+    # Django lo carga al configurar el logging
+    MODULOS_DIFERIDOS = [
+        "PIL", "PIL.Image", "crispy_forms.helper", "crispy_forms.layout", "crispy_forms.bootstrap",
+        "urllib.request",
+    ]
+
+    def test_arranque_en_frio(self):
+        perfil = medir_arranque(importar_urls=True)
+        for modulo in self.MODULOS_DIFERIDOS:
+            self.assertNotIn(modulo, perfil.nombres)
+        self.assertLess(perfil.segundos, self.PRESUPUESTO_SEGUNDOS)
+
+    def test_arranque_de_comandos_de_datos(self):
+        # Los system checks importan formularios y modelos con imagen; estos
+        # comandos no los corren, así que tampoco cargan Pillow ni crispy
+        for comando in ["import_productos", "reconstruir_series", "sincronizar_replica"]:
+            with self.subTest(comando=comando):
+                perfil = medir_arranque(comando=comando)
+                for modulo in self.MODULOS_DIFERIDOS:
+                    self.assertNotIn(modulo, perfil.nombres)
+
+
+class ProductoUpdateConcurrenciaTests(TestCase):
+    def setUp(self):
+        self.producto = Producto.objects.create(
+            codigo="C1", nombre="Tornillo", descripcion="x", precio=Decimal("1.00"), stock=10, stock_minimo=2
+        )
+        self.url = reverse("productos:producto_update", args=[self.producto.pk])
+
+    def _datos(self, **cambios):
+        """Lo que envía el navegador con el formulario abierto ahora y los campos editados."""
+        form = self.client.get(self.url).context["form"]
+        datos = {}
+        for nombre, campo in form.fields.items():
+            valor = form[nombre].value()
+            if campo.show_hidden_initial:
+                datos[nombre] = datos[form.add_initial_prefix(nombre)] = valor
+            elif nombre == "version":
+                datos[nombre] = valor
+        datos.update(cambios)
+        return datos
+
+    def _reenviar(self, response):
+        """Reenvía sin cambios el formulario devuelto por un conflicto."""
+        return self.client.post(self.url, response.context["form"].data)
+
+    def test_guarda_solo_campos_editados(self):
+        datos = self._datos(nombre="Tornillo largo", stock=99)
+        # Otro proceso cambia el precio sin pasar por save() (no incrementa la versión)
+        Producto.objects.filter(pk=self.producto.pk).update(precio=Decimal("2.00"))
+        response = self.client.post(self.url, datos)
+
+        self.assertRedirects(response, reverse("productos:producto_list"), fetch_redirect_response=False)
+        self.producto.refresh_from_db()
+        self.assertEqual(
+            (self.producto.nombre, self.producto.precio, self.producto.stock, self.producto.version),
+            ("Tornillo largo", Decimal("2.00"), 10, 1),
+        )
+
+    def test_conflicto_con_movimiento_concurrente(self):
+        datos = self._datos(descripcion="nueva")
+        # Se registra una salida mientras el formulario está abierto
+        self.client.post(
+            reverse("productos:movimiento_create", args=[self.producto.pk]), {"tipo": "salida", "cantidad": 4}
+        )
+        response = self.client.post(self.url, datos)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("fue modificado", str(response.context["form"].non_field_errors()))
+        self.assertNotIn("stock", response.context["form"].fields)
+        self.producto.refresh_from_db()
+        self.assertEqual((self.producto.descripcion, self.producto.stock, self.producto.version), ("x", 6, 1))
+
+        # El formulario devuelto lleva la versión vigente: confirmarlo sin cambios guarda la edición
+        self.assertEqual(self._reenviar(response).status_code, 302)
+        self.producto.refresh_from_db()
+        self.assertEqual((self.producto.descripcion, self.producto.stock, self.producto.version), ("nueva", 6, 2))
+
+    def test_movimientos_no_pisan_otros_campos(self):
+        # Otro proceso (por ejemplo el admin) edita el producto sin pasar por esta vista
+        Producto.objects.filter(pk=self.producto.pk).update(nombre="Tornillo largo", precio=Decimal("2.00"))
+        movimiento_url = reverse("productos:movimiento_create", args=[self.producto.pk])
+
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.post(movimiento_url, {"tipo": "entrada", "cantidad": 5})
+        # Cada request vacía el registro de consultas: se revisa antes de la siguiente
+        actualizaciones = [q["sql"] for q in consultas if q["sql"].startswith('UPDATE "productos_producto"')]
+        self.assertEqual(len(actualizaciones), 1)
+        self.assertNotIn('"nombre"', actualizaciones[0])
+
+        self.client.post(reverse("productos:ajustar_stock", args=[self.producto.pk]), {"cantidad": 12})
+        response = self.client.post(movimiento_url, {"tipo": "salida", "cantidad": 20})
+
+        self.assertIn("cantidad", response.context["form"].errors)
+        self.producto.refresh_from_db()
+        self.assertEqual(
+            (self.producto.nombre, self.producto.precio, self.producto.stock, self.producto.version),
+            ("Tornillo largo", Decimal("2.00"), 12, 2),
+        )
+
+    def test_conflicto_entre_ediciones(self):
+        datos = self._datos(nombre="Otro")
+        self.assertEqual(self.client.post(self.url, self._datos(precio="2.00")).status_code, 302)
+        response = self.client.post(self.url, datos)
+
+        self.assertEqual(response.status_code, 200)
+        form = response.context["form"]
+        self.assertEqual((form["version"].value(), form["nombre"].value(), form["precio"].value()), ("1", "Otro", "2.00"))
+        self.assertIn('name="initial-precio" value="2.00"', response.content.decode())
+        self.producto.refresh_from_db()
+        self.assertEqual((self.producto.nombre, self.producto.precio), ("Tornillo", Decimal("2.00")))
+
+        # Reenviar sin cambios guarda el nombre y no vuelve al precio viejo
+        self.assertEqual(self._reenviar(response).status_code, 302)
+        self.producto.refresh_from_db()
+        self.assertEqual((self.producto.nombre, self.producto.precio, self.producto.version), ("Otro", Decimal("2.00"), 2))
+
+    def test_crear_sin_version(self):
+        response = self.client.post(reverse("productos:producto_create"), {
+            "codigo": "C2", "nombre": "Tuerca", "descripcion": "x", "precio": "1.00",
+            "stock": 3, "stock_minimo": 1, "version": "",
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Producto.objects.get(codigo="C2").version, 0)
+
+
+@override_settings(INVENTARIO_REPLICAS=["replica"])
+class RuteoReplicaTests(TransactionTestCase):
+    # En tests la réplica es un espejo de 'default' con otra conexión: hace
+    # falta TransactionTestCase para que vea los datos confirmados
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        self.producto = Producto.objects.create(codigo="R1", nombre="Tornillo", descripcion="x", precio=1, stock=10)
+        reiniciar_estadisticas()
+
+    def test_listados_leen_de_la_replica(self):
+        response = self.client.get(reverse("productos:producto_list"))
+        self.assertEqual(list(response.context["productos"]), [self.producto])
+        self.assertEqual(estadisticas_ruteo(), {("replica", "replica"): 1})
+
+    def test_detalle_lee_de_la_replica(self):
+        MovimientoStock.objects.create(producto=self.producto, tipo="entrada", cantidad=10, usuario="ana")
+        reiniciar_estadisticas()
+        response = self.client.get(reverse("productos:producto_detail", args=[self.producto.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["movimientos"]), 1)
+        # El producto y sus últimos movimientos, todo desde la réplica
+        self.assertEqual(set(estadisticas_ruteo()), {("replica", "replica")})
+
+    def test_stock_bajo_lee_de_la_replica(self):
+        bajo = Producto.objects.create(codigo="R2", nombre="Tuerca", descripcion="x", precio=1, stock=1)
+        reiniciar_estadisticas()
+        response = self.client.get(reverse("productos:stock_bajo_list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context["productos"]), [bajo])
+        self.assertEqual(estadisticas_ruteo(), {("replica", "replica"): 1})
+
+    def test_escrituras_y_vistas_de_edicion_usan_el_primario(self):
+        self.client.get(reverse("productos:producto_update", args=[self.producto.pk]))
+        self.assertEqual(estadisticas_ruteo(), {})
+
+    def test_lecturas_tras_escribir_quedan_en_el_primario(self):
+        self.client.post(
+            reverse("productos:movimiento_create", args=[self.producto.pk]), {"tipo": "salida", "cantidad": 1}
+        )
+        self.client.get(reverse("productos:producto_list"))
+        self.assertEqual(estadisticas_ruteo(), {("default", "escritura_reciente"): 1})
+
+        # Otra sesión sigue leyendo de la réplica
+        self.client_class().get(reverse("productos:producto_list"))
+        self.assertEqual(estadisticas_ruteo()[("replica", "replica")], 1)
+
+    def test_una_replica_por_bloque(self):
+        with mock.patch("productos.routers.random.choice", wraps=random.choice) as elegir:
+            with lectura_en_replica():
+                list(Producto.objects.all())
+                list(MovimientoStock.objects.all())
+        self.assertEqual(elegir.call_count, 1)
+        self.assertEqual(estadisticas_ruteo(), {("replica", "replica"): 2})
+
+    def test_replica_sin_tablas_lee_del_primario(self):
+        # override_settings olvida las réplicas ya verificadas
+        with override_settings(INVENTARIO_REPLICAS=["replica"]):
+            with mock.patch.object(connections["replica"].introspection, "table_names", return_value=[]):
+                response = self.client.get(reverse("productos:producto_list"))
+        self.assertEqual(list(response.context["productos"]), [self.producto])
+        self.assertEqual(estadisticas_ruteo(), {("default", "replica_no_disponible"): 1})
+
+
+class SinkPrueba(notificaciones.Sink):
+    enviados = []
+
+    def enviar(self, resumen):
+        SinkPrueba.enviados.append(resumen)
+
+
+@override_settings(
+    INVENTARIO_REPLICAS=[],
+    INVENTARIO_NOTIFICACIONES={"INTERVALO": 3600, "SINKS": [{"CLASE": "productos.tests.SinkPrueba"}]},
+)
+class NotificacionesStockBajoTests(TestCase):
+    def setUp(self):
+        SinkPrueba.enviados = []
+        self.producto = Producto.objects.create(
+            codigo="N1", nombre="Tornillo", descripcion="x", precio=1, stock=10, stock_minimo=5
+        )
+
+    def _mover(self, tipo, cantidad, producto=None):
+        self.client.post(
+            reverse("productos:movimiento_create", args=[(producto or self.producto).pk]),
+            {"tipo": tipo, "cantidad": cantidad},
+        )
+
+    def test_resumen_agrupa_los_cruces_de_un_producto(self):
+        self._mover("salida", 6)   # 10 -> 4: cruza
+        self._mover("salida", 1)   # 4 -> 3: ya estaba por debajo
+        self._mover("entrada", 10)  # 3 -> 13
+        self._mover("salida", 12)  # 13 -> 1: vuelve a cruzar
+        self.assertEqual(CruceStockBajo.objects.count(), 2)
+
+        call_command("notificar_stock_bajo", "--una-vez", stdout=io.StringIO())
+        self.assertEqual(len(SinkPrueba.enviados), 1)
+        item, = SinkPrueba.enviados[0].items
+        self.assertEqual((item["producto"], item["stock_anterior"], item["stock"], item["cruces"]), (self.producto.pk, 10, 1, 2))
+        self.assertFalse(CruceStockBajo.objects.exists())
+        self.assertIsNone(notificaciones.enviar_resumen(notificaciones.construir_sinks()))
+
+    def test_resumenes_acotados(self):
+        for i in range(3):
+            producto = Producto.objects.create(nombre=f"P{i}", descripcion="x", precio=1, stock=5, stock_minimo=5)
+            self._mover("salida", 1, producto)
+
+        primero = notificaciones.enviar_resumen([SinkPrueba()], max_cruces=2)
+        segundo = notificaciones.enviar_resumen([SinkPrueba()], max_cruces=2)
+        self.assertEqual((len(primero.items), primero.pendientes), (2, 1))
+        self.assertEqual((len(segundo.items), segundo.pendientes), (1, 0))
+        self.assertIsNone(notificaciones.enviar_resumen([SinkPrueba()], max_cruces=2))
+
+    def test_sink_fallido_conserva_los_cruces(self):
+        class SinkRoto(notificaciones.Sink):
+            def enviar(self, resumen):
+                raise OSError("sin conexión")
+
+        self._mover("salida", 6)
+        with self.assertLogs("productos.notificaciones", "ERROR"):
+            resumen = notificaciones.enviar_resumen([SinkPrueba(), SinkRoto()])
+        self.assertEqual(resumen.fallidos, ["SinkRoto"])
+        self.assertEqual(CruceStockBajo.objects.count(), 1)
+
+        # El comando no reintenta en seguida: espera al próximo intervalo
+        with mock.patch.object(notificaciones.Sink, "enviar", side_effect=OSError), self.assertLogs("productos.notificaciones", "ERROR"):
+            with override_settings(INVENTARIO_NOTIFICACIONES={"SINKS": [{"CLASE": "productos.notificaciones.Sink"}]}):
+                salida = io.StringIO()
+                call_command("notificar_stock_bajo", "--una-vez", stdout=io.StringIO(), stderr=salida)
+        self.assertIn("Falló el envío a Sink", salida.getvalue())
+
+        # El próximo resumen vuelve a incluirlo y, enviado, lo borra
+        resumen = notificaciones.enviar_resumen([SinkPrueba()])
+        self.assertEqual([item["producto"] for item in resumen.items], [self.producto.pk])
+        self.assertFalse(CruceStockBajo.objects.exists())
+
+    def test_sin_sinks_no_registra_cruces(self):
+        with override_settings(INVENTARIO_NOTIFICACIONES={"SINKS": []}):
+            self._mover("salida", 6)
+            with self.assertRaises(CommandError):
+                call_command("notificar_stock_bajo", "--una-vez")
+        self.assertFalse(CruceStockBajo.objects.exists())
+
+    def test_archivo_sink(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = f"{directorio}/avisos/stock_bajo.jsonl"
+            sink = notificaciones.ArchivoSink(ruta)
+            sink.enviar(notificaciones.Resumen([{"producto": 1, "nombre": "Tornillo"}]))
+            with open(ruta, encoding="utf-8") as archivo:
+                self.assertEqual(json.loads(archivo.readline())["productos"][0]["nombre"], "Tornillo")
@@ -6,10 +6,16 @@ app_name = 'productos'
 urlpatterns = [
     path('', views.ProductoListView.as_view(), name='producto_list'),
     path('nuevo/', views.ProductoCreateView.as_view(), name='producto_create'),
+    path('importar/', views.ProductoImportView.as_view(), name='producto_import'),
     path('<int:pk>/', views.ProductoDetailView.as_view(), name='producto_detail'),
     path('<int:pk>/editar/', views.ProductoUpdateView.as_view(), name='producto_update'),
     path('<int:pk>/eliminar/', views.ProductoDeleteView.as_view(), name='producto_delete'),
     path('<int:pk>/movimiento/', views.MovimientoStockCreateView.as_view(), name='movimiento_create'),
     path('<int:pk>/ajustar-stock/', views.AjusteStockView.as_view(), name='ajustar_stock'),
+    path('<int:pk>/movimientos/', views.MovimientoHistorialView.as_view(), name='producto_movimiento_historial'),
+    path('movimientos/', views.MovimientoHistorialView.as_view(), name='movimiento_historial'),
+    path('api/movimientos/', views.MovimientoHistorialAPIView.as_view(), name='movimiento_historial_api'),
+    path('api/<int:pk>/movimientos/', views.MovimientoHistorialAPIView.as_view(), name='producto_movimiento_historial_api'),
+    path('api/<int:pk>/serie-stock/', views.SerieStockAPIView.as_view(), name='serie_stock_api'),
     path('stock-bajo/', views.StockBajoListView.as_view(), name='stock_bajo_list'),
 ]
\ No newline at end of file
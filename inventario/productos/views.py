@@ -2,22 +2,45 @@
 # productos/views.py
 # Este archivo contiene la lógica de la aplicación a través de las Vistas Basadas en Clases (CBVs).
 # -----------------------------------------------------------------------------
+from datetime import datetime, time, timedelta
 from django.shortcuts import render
-from django.views.generic import ListView, CreateView, UpdateView, DeleteView, DetailView, FormView
+from django.views.generic import ListView, CreateView, UpdateView, DeleteView, DetailView, FormView, View
+from django.core.exceptions import BadRequest
+from django.http import JsonResponse, QueryDict
 from django.urls import reverse_lazy
 from django.contrib import messages
 from django.shortcuts import get_object_or_404, redirect
+from django.db import transaction
 from django.db.models import Q, F
 from django.utils import timezone
-from .models import Producto, MovimientoStock
-from .forms import ProductoForm, MovimientoStockForm, AjusteStockForm
+from django.utils.dateparse import parse_date
+from .models import Producto, MovimientoStock, SerieStock
+from .forms import ProductoForm, MovimientoStockForm, AjusteStockForm, ImportarProductosForm, FiltroMovimientosForm
+from .importacion import ArchivoInvalido, detectar_formato, importar_productos
+from .paginacion import SIGUIENTE, paginar_keyset
+from .routers import lectura_en_replica
 
 
-class ProductoListView(ListView):
+class LecturaReplicaMixin:
+    """
+    Ejecuta la vista dentro de lectura_en_replica() para que sus consultas
+    puedan ir a una réplica. Se usa solo en vistas de lectura.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        with lectura_en_replica():
+            response = super().dispatch(request, *args, **kwargs)
+            # Las plantillas evalúan los querysets al renderizar: se renderiza acá adentro
+            if hasattr(response, "render") and not response.is_rendered:
+                response.render()
+        return response
+
+
+class ProductoListView(LecturaReplicaMixin, ListView):
     """Muestra una lista de todos los productos."""
     model = Producto
-    template_name = "producto/producto_list.html"
-    context_object_name = "producto"
+    template_name = "productos/producto_list.html"
+    context_object_name = "productos"
 
     def get_queryset(self):
         """Sobrescribe para permitir el filtrado por stock bajo."""
@@ -39,7 +62,7 @@ class ProductoListView(ListView):
         return context
     
 
-class ProductoDetailView(DetailView):
+class ProductoDetailView(LecturaReplicaMixin, DetailView):
     """Muestra los detalles de un producto específico."""
     model = Producto
     template_name = "productos/producto_detail.html"
@@ -79,18 +102,100 @@ class ProductoCreateView(CreateView):
         return response
     
 
+class ProductoImportView(FormView):
+    """Vista para importar (crear o actualizar) productos desde un archivo."""
+    form_class = ImportarProductosForm
+    template_name = "productos/producto_import.html"
+
+    def form_valid(self, form):
+        """Procesa el archivo subido por lotes y muestra un resumen."""
+        archivo = form.cleaned_data["archivo"]
+        try:
+            resultado = importar_productos(
+                archivo,
+                detectar_formato(archivo.name),
+                usuario = self.request.user.username if self.request.user.is_authenticated else "Sistema"
+            )
+        except ArchivoInvalido as e:
+            form.add_error("archivo", str(e))
+            return self.form_invalid(form)
+
+        messages.success(
+            self.request,
+            f"Importación finalizada: {resultado.creados} creados, {resultado.actualizados} actualizados"
+        )
+        if resultado.total_errores:
+            detalle = ", ".join(f"línea {linea}: {mensaje}" for linea, mensaje in resultado.errores[:5])
+            messages.warning(self.request, f"{resultado.total_errores} filas con errores ({detalle})")
+        return redirect("productos:producto_list")
+
+
 class ProductoUpdateView(UpdateView):
-    """Vista para actualizar un producto existente."""
+    """
+    Vista para actualizar un producto existente.
+    Usa bloqueo optimista: el formulario lleva la versión leída al abrirlo y
+    solo se guarda si nadie modificó el producto desde entonces.
+    """
     model = Producto
-    template_name = "producto/producto_form.html"
+    template_name = "productos/producto_form.html"
     form_class = ProductoForm
-    success_url = reverse_lazy("producto:producto_list")
+    success_url = reverse_lazy("productos:producto_list")
 
     def form_valid(self, form):
-        """Sobrescribe para mostrar un mensaje de éxito."""
-        response = super().form_valid(form)
+        """
+        Reserva la nueva versión con un UPDATE condicional (WHERE version = n)
+        y guarda solo los campos modificados. Si la versión ya cambió informa
+        el conflicto en lugar de pisar los cambios de otro usuario o de un
+        movimiento de stock.
+        """
+        self.object = form.instance
+        campos = [campo for campo in form.changed_data if campo != "version"]
+        if not campos:
+            messages.info(self.request, "No hubo cambios en el producto")
+            return redirect(self.get_success_url())
+
+        version = form.cleaned_data["version"]
+        with transaction.atomic():
+            reservada = Producto.objects.filter(pk=self.object.pk, version=version).update(
+                version=F("version") + 1
+            )
+            if not reservada:
+                return self.form_conflicto(form)
+            self.object.version = version + 1
+            self.object.save(update_fields=campos + ["fecha_actualizacion"])
+
         messages.success(self.request, "Producto actualizado exitosamente")
-        return response
+        return redirect(self.get_success_url())
+
+    def form_conflicto(self, form):
+        """
+        Vuelve a mostrar el formulario sobre los valores actuales del producto
+        y con su versión vigente, conservando solo los campos que el usuario
+        editó. Reenviarlo sin cambios no pisa lo que guardó otro usuario.
+        """
+        self.object = get_object_or_404(Producto, pk=self.object.pk)
+        editados = [campo for campo in form.changed_data if campo != "version"]
+        actual = self.get_form_class()(instance=self.object)
+        datos = QueryDict(mutable=True)
+        for nombre, campo in actual.fields.items():
+            valor = actual[nombre].value()
+            valor = "" if valor is None else str(valor)
+            if campo.show_hidden_initial:
+                datos[actual.add_initial_prefix(nombre)] = valor
+            if nombre in editados and nombre in form.data:
+                datos.setlist(actual.add_prefix(nombre), form.data.getlist(form.add_prefix(nombre)))
+            else:
+                datos[actual.add_prefix(nombre)] = valor
+        form = self.get_form_class()(datos, instance=self.object)
+        form.is_valid()
+        form.add_error(
+            None,
+            "El producto fue modificado por otro usuario o por un movimiento de stock "
+            "mientras lo editabas. El formulario muestra los valores actuales con tus cambios en: "
+            f"{', '.join(str(form.fields[campo].label) for campo in editados) or 'ninguno'}. "
+            "Revisá los datos y volvé a guardar."
+        )
+        return self.form_invalid(form)
     
 
 class ProductoDeleteView(DeleteView):
@@ -105,6 +210,21 @@ class ProductoDeleteView(DeleteView):
         return super().delete(request, *args, **kwargs)
     
 
+def _actualizar_stock(producto, nuevo_stock, **condiciones):
+    """
+    Escribe el stock (y la versión y la fecha de actualización) con un UPDATE
+    que no toca el resto de los campos, así un movimiento no pisa una edición
+    hecha mientras tanto. Devuelve False si el producto no cumple las
+    condiciones. Deja en 'producto' los valores guardados.
+    """
+    actualizados = Producto.objects.filter(pk=producto.pk, **condiciones).update(
+        stock=nuevo_stock, version=F("version") + 1, fecha_actualizacion=timezone.now()
+    )
+    if actualizados:
+        producto.refresh_from_db(fields=["stock", "version", "fecha_actualizacion"])
+    return bool(actualizados)
+
+
 class MovimientoStockCreateView(CreateView):
     """Vista para registrar un nuevo movimiento de stock."""
     model = MovimientoStock
@@ -129,19 +249,21 @@ class MovimientoStockCreateView(CreateView):
         movimiento.producto = get_object_or_404(Producto, pk=self.kwargs["pk"])
         movimiento.usuario = self.request.user.username if self.request.user.is_authenticated else "Sistema"
 
-        if movimiento.tipo == "entrada":
-            movimiento.producto.stock += movimiento.cantidad
-        elif movimiento.tipo == "salida":
-            # Si no hay suficiente stock, se añade un error y se re-renderiza el formulario
-            if movimiento.producto.stock >= movimiento.cantidad:
-                movimiento.producto.stock -= movimiento.cantidad
+        with transaction.atomic():
+            if movimiento.tipo == "entrada":
+                actualizado = _actualizar_stock(movimiento.producto, F("stock") + movimiento.cantidad)
+            elif movimiento.tipo == "salida":
+                # La condición va en el UPDATE: dos salidas simultáneas no pueden dejar stock negativo
+                actualizado = _actualizar_stock(
+                    movimiento.producto, F("stock") - movimiento.cantidad, stock__gte=movimiento.cantidad
+                )
             else:
+                actualizado = True
+            if not actualizado:
+                # Si no hay suficiente stock, se añade un error y se re-renderiza el formulario
                 form.add_error("cantidad", "No hay stock suficiente")
                 return self.form_invalid(form)
-        
-        # Guarda el producto actualizado y el nuevo movimiento
-        movimiento.producto.save()
-        movimiento.save()
+            movimiento.save()
 
         messages.success(self.request, f"Movimiento de stock registrado exitosamente")
         return redirect("productos:producto_detail", pk=movimiento.producto.pk)       
@@ -174,18 +296,21 @@ class AjusteStockView(FormView):
         diferencia = nueva_cantidad - producto.stock
 
         if diferencia != 0:
-            tipo = "entrada" if diferencia > 0 else "salida" 
-            MovimientoStock.objects.create(
-                producto=producto,
-                tipo=tipo,
-                cantidad=abs(diferencia),
-                motivo=motivo,
-                fecha=timezone.now(),
-                usuario = self.request.user.username if self.request.user.is_authenticated else "Sistema"
-            )
+            with transaction.atomic():
+                # Solo si el stock sigue siendo el leído: si no, la diferencia registrada sería otra
+                if not _actualizar_stock(producto, nueva_cantidad, stock=producto.stock):
+                    form.add_error("cantidad", "El stock cambió mientras se hacía el ajuste. Revisá el valor.")
+                    return self.form_invalid(form)
 
-            producto.stock = nueva_cantidad
-            producto.save()
+                tipo = "entrada" if diferencia > 0 else "salida" 
+                MovimientoStock.objects.create(
+                    producto=producto,
+                    tipo=tipo,
+                    cantidad=abs(diferencia),
+                    motivo=motivo,
+                    fecha=timezone.now(),
+                    usuario = self.request.user.username if self.request.user.is_authenticated else "Sistema"
+                )
 
             messages.success(self.request, f"Stock actualizado exitosamente")
         else:
@@ -194,7 +319,7 @@ class AjusteStockView(FormView):
         return redirect("productos:producto_detail", pk=producto.pk)
 
 
-class StockBajoListView(ListView):
+class StockBajoListView(LecturaReplicaMixin, ListView):
     """Muestra una lista filtrada solo para productos con stock bajo."""
     model = Producto
     template_name = "productos/stock_bajo_list.html"
@@ -206,4 +331,155 @@ class StockBajoListView(ListView):
         cuyo stock sea menor que el stock mínimo.
         """
         # Se ha corregido la sintaxis. Se usa F() para una comparación eficiente
-        return Producto.objects.filter(stock__lt=F("stock_minimo")).order_by("stock")
\ No newline at end of file
+        return Producto.objects.filter(stock__lt=F("stock_minimo")).order_by("stock")
+
+
+def _inicio_del_dia(fecha):
+    """Convierte una fecha en el datetime (aware) de las 00:00 de ese día."""
+    return timezone.make_aware(datetime.combine(fecha, time.min))
+
+
+class HistorialMovimientosMixin:
+    """
+    Lógica compartida por el historial HTML y la API: filtros por tipo,
+    usuario y rango de fechas, y paginación por cursor sobre (fecha, id).
+    Si la URL incluye 'pk' el historial se limita a ese producto.
+    """
+    tamanio_pagina = 50
+
+    def get_producto(self):
+        if "pk" in self.kwargs:
+            return get_object_or_404(Producto, pk=self.kwargs["pk"])
+        return None
+
+    def filtrar_movimientos(self, form, producto=None):
+        """Aplica los filtros del formulario como rangos sobre los índices compuestos."""
+        queryset = MovimientoStock.objects.select_related("producto")
+        if producto is not None:
+            queryset = queryset.filter(producto=producto)
+        if form.is_valid():
+            datos = form.cleaned_data
+            if datos["tipo"]:
+                queryset = queryset.filter(tipo=datos["tipo"])
+            if datos["usuario"]:
+                queryset = queryset.filter(usuario=datos["usuario"])
+            # Rango semiabierto en lugar de fecha__date para poder usar el índice
+            if datos["desde"]:
+                queryset = queryset.filter(fecha__gte=_inicio_del_dia(datos["desde"]))
+            if datos["hasta"]:
+                queryset = queryset.filter(fecha__lt=_inicio_del_dia(datos["hasta"] + timedelta(days=1)))
+        return queryset
+
+    def get_pagina(self, queryset, tamanio):
+        try:
+            return paginar_keyset(
+                queryset,
+                cursor=self.request.GET.get("cursor") or None,
+                direccion=self.request.GET.get("direccion", SIGUIENTE),
+                tamanio=tamanio,
+            )
+        except ValueError as e:
+            raise BadRequest(str(e))
+
+
+class MovimientoHistorialView(LecturaReplicaMixin, HistorialMovimientosMixin, ListView):
+    """Muestra el historial de movimientos, global o de un producto."""
+    model = MovimientoStock
+    template_name = "productos/movimiento_historial.html"
+    context_object_name = "movimientos"
+
+    def get_queryset(self):
+        """Devuelve los movimientos filtrados (la paginación se hace en el contexto)."""
+        self.producto = self.get_producto()
+        self.filtro_form = FiltroMovimientosForm(self.request.GET or None)
+        return self.filtrar_movimientos(self.filtro_form, self.producto)
+
+    def get_context_data(self, **kwargs):
+        """Reemplaza la lista completa por la página pedida y sus cursores."""
+        pagina = self.get_pagina(self.object_list, self.tamanio_pagina)
+        context = super().get_context_data(object_list=pagina.items, **kwargs)
+        context["pagina"] = pagina
+        context["producto"] = self.producto
+        context["filtro_form"] = self.filtro_form
+        return context
+
+
+class MovimientoHistorialAPIView(LecturaReplicaMixin, HistorialMovimientosMixin, View):
+    """Devuelve el historial de movimientos en JSON, paginado por cursor."""
+    tamanio_maximo = 200
+
+    def get(self, request, *args, **kwargs):
+        producto = self.get_producto()
+        form = FiltroMovimientosForm(request.GET)
+        if not form.is_valid():
+            return JsonResponse({"errores": form.errors}, status=400)
+
+        try:
+            limite = int(request.GET.get("limite", self.tamanio_pagina))
+        except ValueError:
+            limite = 0
+        if not 0 < limite <= self.tamanio_maximo:
+            return JsonResponse(
+                {"errores": {"limite": [f"Debe estar entre 1 y {self.tamanio_maximo}"]}}, status=400
+            )
+
+        pagina = self.get_pagina(self.filtrar_movimientos(form, producto), limite)
+        return JsonResponse({
+            "resultados": [
+                {
+                    "id": movimiento.pk,
+                    "producto": movimiento.producto_id,
+                    "producto_nombre": movimiento.producto.nombre,
+                    "tipo": movimiento.tipo,
+                    "cantidad": movimiento.cantidad,
+                    "motivo": movimiento.motivo,
+                    "fecha": movimiento.fecha.isoformat(),
+                    "usuario": movimiento.usuario,
+                }
+                for movimiento in pagina.items
+            ],
+            "siguiente": pagina.cursor_siguiente,
+            "anterior": pagina.cursor_anterior,
+        })
+
+
+class SerieStockAPIView(LecturaReplicaMixin, View):
+    """
+    Devuelve la serie de stock de un producto para graficar.
+    El formato es columnar: un arreglo por dato (inicio en segundos epoch,
+    variación neta y stock al cierre), alineados por posición.
+    """
+
+    def get(self, request, *args, **kwargs):
+        producto = get_object_or_404(Producto, pk=self.kwargs["pk"])
+        granularidad = request.GET.get("granularidad", "dia")
+        if granularidad not in dict(SerieStock.GRANULARIDAD_CHOICES):
+            return JsonResponse({"errores": {"granularidad": ["Valor inválido"]}}, status=400)
+
+        queryset = SerieStock.objects.filter(producto=producto, granularidad=granularidad)
+        for parametro, lookup, dias in (("desde", "inicio__gte", 0), ("hasta", "inicio__lt", 1)):
+            if request.GET.get(parametro):
+                try:
+                    fecha = parse_date(request.GET[parametro])
+                except ValueError:
+                    fecha = None
+                if fecha is None:
+                    return JsonResponse({"errores": {parametro: ["Fecha inválida"]}}, status=400)
+                queryset = queryset.filter(**{lookup: _inicio_del_dia(fecha + timedelta(days=dias))})
+
+        inicio, delta, stock = [], [], []
+        for fecha, delta_neto, stock_cierre in queryset.order_by("inicio").values_list(
+            "inicio", "delta_neto", "stock_cierre"
+        ):
+            inicio.append(int(fecha.timestamp()))
+            delta.append(delta_neto)
+            stock.append(stock_cierre)
+
+        return JsonResponse({
+            "producto": producto.pk,
+            "granularidad": granularidad,
+            "stock_actual": producto.stock,
+            "inicio": inicio,
+            "delta": delta,
+            "stock": stock,
+        })